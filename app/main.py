@@ -1,9 +1,18 @@
-from snp.gui.SNP import SNP
+import sys
+
+from snp.snp_cli import build_arg_parser, run_cli
 
 
 def main():
-    snp = SNP()
-    snp.mainloop()
+    args = build_arg_parser().parse_args()
+    # без аргументов запускаем GUI
+    if len(sys.argv) == 1:
+        from snp.gui.SNP import SNP
+
+        snp = SNP()
+        snp.mainloop()
+    else:
+        run_cli(args)
 
 
 if __name__ == "__main__":
@@ -1,17 +1,23 @@
+import argparse
 import asyncio
 import os
 import re
 import threading
 
 import customtkinter as ctk
-import pandas as pd
 
 from tkinter import filedialog, messagebox
 
 from PIL import Image
 
 
+from snp.snp_cli import positive_float
+from snp.snp_dataset import dataset_available
 from snp.snp_logic import start, stop
+from snp.snp_profiler import profiler
+from snp.snp_report import create_report
+from snp.snp_settings.settings import OUTPUT, PROFILING
+from snp.snp_storage import format_age, profile_store
 from logger.snp_logger import logger, set_logger_handler
 
 
@@ -19,6 +25,16 @@ ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("dark-blue")
 
 
+def is_positive_float(value: str) -> bool:
+    """Проверка лимита времени так же, как флага --max-seconds"""
+    try:
+        positive_float(value)
+    except argparse.ArgumentTypeError:
+        return False
+
+    return True
+
+
 class SNP(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -111,19 +127,77 @@ class SNP(ctk.CTk):
         self.nickname_requred_entry.place(relx=0.04, rely=0.45)
         self.nickname_requred_entry.insert(0, "Тут ник")
 
+        self.max_seconds_label = ctk.CTkLabel(
+            master=self, text="Лимит времени, сек", font=("Courier", 18)
+        )
+        self.max_seconds_label.place(relx=0.04, rely=0.55)
+
+        self.max_seconds_entry = ctk.CTkEntry(
+            master=self,
+            placeholder_text="без лимита",
+            width=150,
+            height=40,
+            border_width=2,
+            corner_radius=10,
+            fg_color=self.save_dir_path_entry._fg_color,
+            border_color=self.save_dir_path_entry._border_color,
+        )
+        self.max_seconds_entry.place(relx=0.31, rely=0.54)
+
+        self.profile_checkbox = ctk.CTkCheckBox(
+            master=self, text="Профилирование", font=("Courier", 18)
+        )
+        self.profile_checkbox.place(relx=0.04, rely=0.615)
+        if PROFILING.enabled:
+            self.profile_checkbox.select()
+
+        self.output_format_menu = ctk.CTkOptionMenu(
+            master=self, values=["xlsx", "parquet"], width=150
+        )
+        self.output_format_menu.place(relx=0.31, rely=0.615)
+        self.output_format_menu.set(OUTPUT.format)
+
         # -------------------- Старт -------------------- #
         self.start_button = ctk.CTkButton(
             master=self,
             text="Начать",
-            width=250,
+            width=170,
             height=70,
-            font=("Courier", 24),
+            font=("Courier", 20),
             corner_radius=10,
             border_width=2,
             hover_color="#14375e",
             command=self.start_button_handler,
         )
-        self.start_button.place(relx=0.13, rely=0.65)
+        self.start_button.place(relx=0.04, rely=0.68)
+
+        # -------------------- Поиск в хранилище -------------------- #
+        self.query_button = ctk.CTkButton(
+            master=self,
+            text="Найти в базе",
+            width=170,
+            height=70,
+            font=("Courier", 20),
+            corner_radius=10,
+            border_width=2,
+            hover_color="#14375e",
+            command=self.query_button_handler,
+        )
+        self.query_button.place(relx=0.19, rely=0.68)
+
+        # -------------------- Стоп -------------------- #
+        self.stop_button = ctk.CTkButton(
+            master=self,
+            text="Стоп",
+            width=170,
+            height=70,
+            font=("Courier", 20),
+            corner_radius=10,
+            border_width=2,
+            hover_color="#14375e",
+            command=self.stop_button_handler,
+        )
+        self.stop_button.place(relx=0.34, rely=0.68)
 
         # -------------------- Логи -------------------- #
         self.log_frame = ctk.CTkTextbox(
@@ -160,39 +234,63 @@ class SNP(ctk.CTk):
         self.save_dir_path = self.save_dir_path_entry.get().strip()
         self.file_name = self.output_file_name_entry.get().strip()
         self.nickname = self.nickname_requred_entry.get().strip()
+        self.max_seconds = self.max_seconds_entry.get().strip()
+        self.output_format = self.output_format_menu.get()
 
         # проверяем данные на валидность
-        valid_data = self.validation()
+        if self.output_format == "parquet":
+            valid_data = self.dataset_validation()
+        else:
+            valid_data = self.validation()
         if valid_data:
             # запускаем поток с парсером
             thread = threading.Thread(target=self.start_parsing_handler)
             thread.start()
 
+    def query_button_handler(self):
+        """Хендлер кнопки поиска в локальном хранилище"""
+        nickname = self.nickname_requred_entry.get().strip()
+        if not nickname:
+            logger.error("Не введен никнейм")
+            messagebox.showerror("ERROR", "Никнейм не может быть пустой")
+            return
+
+        results = profile_store.search(nickname)
+        logger.info(f"В базе найдено {len(results)} профилей с ником {nickname}")
+        for result in results:
+            freshness = "устарел" if result["stale"] else "актуален"
+            logger.info(
+                f"{result['url']} - {result['persona']} "
+                f"({', '.join(result['nicknames'])}) - "
+                f"обновлен {format_age(result['age'])} назад, {freshness}"
+            )
+
     def start_parsing_handler(self):
         # запускаем парсер и создаем отчет
-        res = start(self.nickname, self.loop, self.progress_bar)
-        if all(res):
-            self.create_xslx(*res)
+        with profiler.session(self.loop, bool(self.profile_checkbox.get())):
+            res = start(
+                self.nickname,
+                self.loop,
+                self.progress_bar,
+                self.max_seconds,
+                self.output_format,
+            )
+            if all(res):
+                self.create_xslx(*res)
+
+    def stop_button_handler(self):
+        """Хендлер кнопки стоп. Формирует отчет по уже собранным профилям"""
+        stop(self.loop)
 
     def on_closing(self):
         """Хендлер закрытия окна. Останавливает текущие задачи"""
-        stop(self.loop)
+        stop(self.loop, graceful=False)
         self.destroy()
         exit()
 
     def create_xslx(self, rows_list, users_count):
-        """Формирование отчета xlsx"""
-        logger.info("Формирование отчета...")
-        df = pd.DataFrame()
-        for rows in rows_list:
-            new_df = pd.DataFrame(rows)
-            df = pd.concat([df, new_df], ignore_index=True)
-
-        # logger.info("Удаление дубликатов")
-        # df.drop_duplicates(inplace=True)
-        logger.info(f"Отчет содержит {len(df)} из {users_count} строк")
-        df.to_excel(self.full_path, index=False)
-        logger.info(f"Отчет {self.full_path} - создан")
+        """Формирование отчета xlsx или запись в parquet датасет"""
+        create_report(rows_list, users_count, self.full_path)
         messagebox.showinfo("Отчет создан", "Отчет создан")
 
     def validation(self):
@@ -215,7 +313,14 @@ class SNP(ctk.CTk):
         elif not self.nickname:
             logger.error("Не введен никнейм")
             messagebox.showerror("ERROR", "Никнейм не может быть пустой")
+        elif self.max_seconds and not is_positive_float(self.max_seconds):
+            logger.error("Лимит времени должен быть положительным числом")
+            messagebox.showerror(
+                "ERROR", "Лимит времени должен быть положительным числом"
+            )
         elif self.save_dir_path and self.file_name:
+            # пустой лимит - без ограничения времени
+            self.max_seconds = float(self.max_seconds) if self.max_seconds else None
             if not self.file_name.endswith(".xlsx"):
                 self.file_name += ".xlsx"
             self.full_path = os.path.join(self.save_dir_path, self.file_name)
@@ -228,3 +333,22 @@ class SNP(ctk.CTk):
             valid_data = True
 
         return valid_data
+
+    def dataset_validation(self):
+        """Проверка данных для записи в parquet датасет. Папка и файл не нужны"""
+        self.full_path = None
+        if not self.nickname:
+            logger.error("Не введен никнейм")
+            messagebox.showerror("ERROR", "Никнейм не может быть пустой")
+        elif self.max_seconds and not is_positive_float(self.max_seconds):
+            logger.error("Лимит времени должен быть положительным числом")
+            messagebox.showerror(
+                "ERROR", "Лимит времени должен быть положительным числом"
+            )
+        elif not dataset_available():
+            messagebox.showerror("ERROR", "Для вывода в parquet установите pyarrow")
+        else:
+            self.max_seconds = float(self.max_seconds) if self.max_seconds else None
+            return True
+
+        return False
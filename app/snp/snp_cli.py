@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import math
+import os
+import signal
+
+from logger.snp_logger import logger
+from snp.snp_logic import start, stop
+from snp.snp_profiler import profiler
+from snp.snp_dataset import dataset_available
+from snp.snp_report import create_report
+from snp.snp_service import run_service
+from snp.snp_settings.settings import OUTPUT, PROFILING
+from snp.snp_storage import format_age, profile_store
+
+
+class CLIProgress:
+    """Прогресс парсинга для консоли. Повторяет интерфейс CTkProgressBar.set"""
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float) -> None:
+        self.value = value
+        logger.info(f"Прогресс - {value:.0%}")
+
+
+def positive_float(value: str) -> float:
+    """Проверка аргумента командной строки на положительное число"""
+    try:
+        number = float(value)
+    except ValueError:
+        number = 0
+    if not (number > 0 and math.isfinite(number)):
+        raise argparse.ArgumentTypeError(
+            "Лимит времени должен быть положительным числом"
+        )
+
+    return number
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Функция для создания парсера аргументов командной строки"""
+    arg_parser = argparse.ArgumentParser(
+        description="SNP - steam nicknames parser. Без аргументов запускается GUI"
+    )
+    arg_parser.add_argument("-n", "--nickname", help="никнейм для парсинга")
+    arg_parser.add_argument("-o", "--output", help="путь до xlsx отчета")
+    arg_parser.add_argument(
+        "-f",
+        "--format",
+        choices=("xlsx", "parquet"),
+        default=OUTPUT.format,
+        help="формат вывода. parquet - запись в датасет [output].dataset_dir",
+    )
+    arg_parser.add_argument(
+        "--max-seconds",
+        type=positive_float,
+        help="ограничение времени работы. по истечении формируется отчет по собранным профилям",
+    )
+    arg_parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=PROFILING.enabled,
+        help="профилирование парсера. результат сохраняется в [profiling].output_dir",
+    )
+    arg_parser.add_argument(
+        "-q", "--query", help="поиск никнейма в локальном хранилище без парсинга"
+    )
+    arg_parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="запуск сервиса парсинга с HTTP/JSON API на [service].host:[service].port",
+    )
+
+    return arg_parser
+
+
+def run_cli(args: argparse.Namespace) -> None:
+    """
+    Функция для запуска приложения из командной строки
+
+    Args:
+        args (Namespace): аргументы командной строки
+    """
+    if args.serve:
+        run_service()
+    elif args.query:
+        query(args.query)
+    elif args.nickname:
+        parse(
+            args.nickname, args.output, args.max_seconds, args.profile, args.format
+        )
+
+
+def query(nickname: str) -> None:
+    """Поиск никнейма в локальном хранилище"""
+    results = profile_store.search(nickname)
+    logger.info(f"В базе найдено {len(results)} профилей с ником {nickname}")
+    for result in results:
+        freshness = "устарел" if result["stale"] else "актуален"
+        print(
+            result["url"],
+            result["persona"],
+            ", ".join(result["nicknames"]),
+            f"обновлен {format_age(result['age'])} назад, {freshness}",
+            sep="\t",
+        )
+
+
+def parse(
+    nickname: str,
+    output: str | None,
+    max_seconds: float = None,
+    profile: bool = False,
+    output_format: str = OUTPUT.format,
+) -> None:
+    """Запуск парсера и формирование отчета"""
+    if output_format == "parquet":
+        if not dataset_available():
+            return
+    elif not output:
+        logger.error("Не указан путь до отчета (--output)")
+        return
+    else:
+        if not output.endswith(".xlsx"):
+            output += ".xlsx"
+        if os.path.exists(output):
+            logger.error(f"Файл {output} уже существует!")
+            return
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    def on_sigint(signum, frame):
+        # первый Ctrl+C - мягкая остановка с отчетом, повторный - прерывание
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        stop(loop)
+
+    signal.signal(signal.SIGINT, on_sigint)
+    with profiler.session(loop, profile):
+        try:
+            res = start(nickname, loop, CLIProgress(), max_seconds, output_format)
+        except KeyboardInterrupt:
+            # повторный Ctrl+C - отменяем оставшиеся задачи без отчета
+            stop(loop, graceful=False)
+            return
+        if all(res):
+            create_report(*res, output)
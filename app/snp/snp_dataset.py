@@ -0,0 +1,108 @@
+import os
+import time
+import uuid
+
+from urllib.parse import quote
+
+from logger.snp_logger import logger
+from snp.snp_settings.settings import EXCEL_FIELD
+from snp.snp_storage import get_row_nicknames
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+def dataset_available() -> bool:
+    """Проверка, что установлен pyarrow для записи parquet"""
+    if pa is None:
+        logger.error("Для вывода в parquet установите pyarrow")
+        return False
+
+    return True
+
+
+class ParquetSink:
+    """
+    Запись собранных строк в parquet датасет
+
+    Заменяет список `full_rows`: строки пишутся пачками по `batch_size` по
+    мере парсинга страниц. Каждый запуск добавляет файл в партицию
+    `nickname=<ник>/date=<дата>`, история ников хранится в столбце-списке.
+    """
+
+    def __init__(self, nickname: str, dataset_dir: str, batch_size: int):
+        self.nickname = nickname
+        self.batch_size = batch_size
+        self.schema = pa.schema(
+            [
+                ("url", pa.string()),
+                ("description", pa.string()),
+                ("location", pa.string()),
+                ("name", pa.string()),
+                ("nicknames", pa.list_(pa.string())),
+                ("run_id", pa.string()),
+                ("collected_at", pa.timestamp("s")),
+            ]
+        )
+        self.run_id = f"{time.strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        partition_dir = os.path.join(
+            dataset_dir,
+            f"nickname={quote(nickname, safe='')}",
+            f"date={time.strftime('%Y-%m-%d')}",
+        )
+        self.path = os.path.join(partition_dir, f"part-{self.run_id}.parquet")
+        self.writer = None
+        self.batch = []
+        self.pages = 0
+        self.rows_count = 0
+
+    def __len__(self) -> int:
+        return self.pages
+
+    def extend(self, rows_parts: list) -> None:
+        """
+        Функция для записи страниц с аккаунтами в датасет
+
+        Args:
+            rows_parts (List[List[Dict]]): список с данными аккаунтов на стриницу
+        """
+        collected_at = int(time.time())
+        for rows in rows_parts:
+            self.pages += 1
+            for row in rows:
+                self.batch.append(
+                    {
+                        "url": row.get(EXCEL_FIELD.url),
+                        "description": row.get(EXCEL_FIELD.description),
+                        "location": row.get(EXCEL_FIELD.location),
+                        "name": row.get(EXCEL_FIELD.name),
+                        "nicknames": get_row_nicknames(row),
+                        "run_id": self.run_id,
+                        "collected_at": collected_at,
+                    }
+                )
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Запись накопленной пачки строк"""
+        if not self.batch:
+            return
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+
+        self.writer.write_table(pa.Table.from_pylist(self.batch, schema=self.schema))
+        self.rows_count += len(self.batch)
+        self.batch = []
+
+    def close(self) -> None:
+        """Запись оставшихся строк и закрытие файла"""
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
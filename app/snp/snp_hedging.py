@@ -0,0 +1,114 @@
+import asyncio
+import math
+
+from collections import deque
+from typing import Awaitable, Callable
+
+from snp.snp_settings.settings import HEDGING
+
+
+class LatencyTracker:
+    """Скользящее окно длительностей запросов одного типа"""
+
+    def __init__(self, window: int = 1000):
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        """Перцентиль `q` (0-100) по накопленным длительностям"""
+        ordered = sorted(self.samples)
+        index = max(math.ceil(len(ordered) * q / 100) - 1, 0)
+
+        return ordered[index]
+
+
+class Hedger:
+    """
+    Дублирование медленных запросов
+
+    Если запрос отвечает дольше наблюдаемого перцентиля, отправляется одна
+    копия запроса и используется ответ, пришедший первым. Доля дублированных
+    запросов ограничена `max_rate`.
+    """
+
+    def __init__(
+        self, enabled: bool, percentile: float, min_samples: int, max_rate: float
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self.trackers: dict[str, LatencyTracker] = {}
+        self.requests = 0
+        self.hedges = 0
+
+    def hedge_delay(self, endpoint: str) -> float | None:
+        """Задержка перед отправкой копии запроса. None - копию не отправлять"""
+        tracker = self.trackers.setdefault(endpoint, LatencyTracker())
+        if not self.enabled or len(tracker.samples) < self.min_samples:
+            return
+        if self.hedges >= self.max_rate * self.requests:
+            return
+
+        return tracker.percentile(self.percentile)
+
+    async def run(self, endpoint: str, request: Callable[[], Awaitable]):
+        """
+        Функция для выполнения запроса с возможным дублированием
+
+        Args:
+            endpoint (str): тип запроса, для которого собирается статистика
+            request (Callable[[], Awaitable]): функция, создающая корутину запроса
+
+        Returns:
+            ответ запроса, пришедший первым. None если оба запроса не удались
+        """
+        # без дублирования выполняем запрос напрямую, без отдельной задачи
+        if not self.enabled:
+            return await request()
+
+        loop = asyncio.get_running_loop()
+        self.requests += 1
+        delay = self.hedge_delay(endpoint)
+        started = {}
+        tasks = set()
+
+        def launch():
+            task = asyncio.create_task(request())
+            started[task] = loop.time()
+            tasks.add(task)
+
+        launch()
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=delay)
+            # запрос не уложился в перцентиль - отправляем копию
+            if not done and self.hedge_delay(endpoint) is not None:
+                self.hedges += 1
+                launch()
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        continue
+                    # неудачные запросы (таймауты) тоже учитываем, иначе перцентиль занижен
+                    self.trackers[endpoint].add(loop.time() - started[task])
+                    if task.result() is not None:
+                        return task.result()
+
+            # ни один запрос не вернул ответ - возвращаем результат первого
+            return next(iter(started)).result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+# единый механизм дублирования запросов для всех задач парсера
+hedger = Hedger(
+    HEDGING.enabled, HEDGING.percentile, HEDGING.min_samples, HEDGING.max_rate
+)
@@ -2,31 +2,58 @@ import asyncio
 import time
 
 from asyncio import AbstractEventLoop
+from contextlib import nullcontext
 from itertools import islice
+from typing import Callable
 
 from aiohttp import ClientConnectionError, ClientSession
 from aiohttp_retry import ExponentialRetry, RetryClient
 from customtkinter import CTkProgressBar
 
 from logger.snp_logger import logger
+from snp.snp_dataset import ParquetSink
 from snp.snp_parser import get_page_users_info
+from snp.snp_profiler import profiler
 from snp.snp_requests import get_json_content
-from snp.snp_settings.settings import COOKIE, PARSER, URL
+from snp.snp_session import session_manager
+from snp.snp_settings.settings import COOKIE, MEMORY, OUTPUT, PARSER, TIMEOUT, URL
+from snp.snp_shutdown import ShutdownControl
+from snp.snp_spool import RowSpool, release_rows
+from snp.snp_storage import profile_store
 
 
-def stop(loop: AbstractEventLoop) -> None:
-    """Функция для остановки текущих задач"""
+# текущие запуски парсера для кооперативной остановки
+active_controls: set[ShutdownControl] = set()
+
+
+def stop(loop: AbstractEventLoop, graceful: bool = True) -> None:
+    """
+    Функция для остановки текущих задач
+
+    Args:
+        loop (AbstractEventLoop): текущий event_loop для асинхронного парсинга
+        graceful (bool, optional): при значении True дожидается текущих запросов и сохраняет собранные строки. False - отменяет все задачи. По умолчанию True
+    """
+    if graceful and active_controls:
+        for control in list(active_controls):
+            loop.call_soon_threadsafe(control.request_stop)
+        return
+
     tasks = asyncio.all_tasks(loop=loop)
     if tasks:
         for task in tasks:
-            task.cancel()
+            loop.call_soon_threadsafe(task.cancel)
         logger.info("Остановка парсера...")
 
     return
 
 
 def start(
-    nickname: str, loop: AbstractEventLoop, progressbar: CTkProgressBar
+    nickname: str,
+    loop: AbstractEventLoop,
+    progressbar: CTkProgressBar,
+    max_seconds: float = None,
+    output_format: str = OUTPUT.format,
 ) -> tuple:
     """
     Функция для запуска парсера
@@ -35,6 +62,8 @@ def start(
         nickname (str): никнейм для парсинга
         loop (AbstractEventLoop): текущий event_loop для асинхронного парсинга
         progressbar (CTkProgressBar ): экземпляр прогресс бара
+        max_seconds (float, optional): ограничение времени работы. По умолчанию [timeouts].run_budget
+        output_format (str, optional): формат вывода - xlsx или parquet. По умолчанию [output].format
 
     Returns:
         rows (List[List[Dict]]): список с данными аккаунтов на стриницу
@@ -42,22 +71,66 @@ def start(
     """
     logger.info("Запускаем парсер")
     s = time.time()
+    control = ShutdownControl()
+    active_controls.add(control)
+    budget_handle = schedule_run_budget(loop, control, max_seconds)
     try:
         rows, nicks_count = loop.run_until_complete(
-            start_parsing(nickname, progressbar, loop)
+            start_parsing(nickname, progressbar, loop, control, output_format)
         )
     except ClientConnectionError:
         logger.error("Нет подключения к интернету или сервер недоступен")
-        stop(loop)
+        stop(loop, graceful=False)
+        return [None] * 2
+    except asyncio.CancelledError:
+        logger.info("Парсер остановлен")
         return [None] * 2
+    finally:
+        active_controls.discard(control)
+        if budget_handle:
+            budget_handle.cancel()
+
+    # отчет по пустому результату не формируется - удаляем буфер строк
+    if not (rows and nicks_count):
+        release_rows(rows)
 
     e = time.time()
     logger.info(f"Время работы - {e-s:.2f} секунд.")
     return rows, nicks_count
 
 
+def schedule_run_budget(
+    loop: AbstractEventLoop, control: ShutdownControl, max_seconds: float = None
+) -> asyncio.TimerHandle | None:
+    """
+    Функция для планирования остановки парсера по истечении времени работы
+
+    Args:
+        loop (AbstractEventLoop): текущий event_loop для асинхронного парсинга
+        control (ShutdownControl): кооперативная остановка парсера
+        max_seconds (float, optional): ограничение времени работы. По умолчанию [timeouts].run_budget
+
+    Returns:
+        budget_handle (Union[TimerHandle, None]): отложенная остановка. None если ограничения нет
+    """
+    # общее время работы парсера. 0 - без ограничения
+    run_budget = max_seconds or TIMEOUT.run_budget
+    if not run_budget:
+        return
+
+    # останавливаемся заранее, чтобы успеть дождаться текущих запросов
+    control.drain_seconds = min(control.drain_seconds, run_budget / 2)
+    return loop.call_later(run_budget - control.drain_seconds, control.request_stop)
+
+
 async def start_parsing(
-    nickname: str, progressbar: CTkProgressBar, loop: AbstractEventLoop
+    nickname: str,
+    progressbar: CTkProgressBar,
+    loop: AbstractEventLoop,
+    control: ShutdownControl,
+    output_format: str = OUTPUT.format,
+    session: ClientSession = None,
+    page_slot: Callable = None,
 ) -> tuple:
     """
     Главная функция асинхронного парсера
@@ -66,65 +139,107 @@ async def start_parsing(
         nickname (str): Никнейм д парсинга
         progressbar (CTkProgressBar): Прогрессбар для обновлен значений
         loop (AbstractEventLoop): текущий event_loop для асинхронного парсинга (
+        control (ShutdownControl): кооперативная остановка парсера
+        output_format (str, optional): формат вывода - xlsx или parquet. По умолчанию [output].format
+        session (ClientSession, optional): общая асинхронная сессия. По умолчанию создается новая
+        page_slot (Callable, optional): фабрика контекстного менеджера, ограничивающего парсинг страниц поиска. По умолчанию без ограничения
 
         Returns:
             rows (List[List[Dict]]): список с данными аккаунтов на стриницу
             nicks_count (int): количество аккаунтов с заданным ником
     """
-    # базовая ссылка на json для поиска по никам
-    search_base_url = URL.search_base_url
-    full_rows = []
-    # async with aiohttp.ClientSession() as session:
-    retry_options = ExponentialRetry(attempts=PARSER.retry_attempt)
-    async with RetryClient(retry_options=retry_options) as session:
-        # получаем cookie session_id для успешного парсинга
-        session_id = await get_session_id(search_base_url, session)
-        logger.info("Ищем страницы")
-        # получаем количество страниц поиска в одной асинхронной задаче
-        slice_by = PARSER.sliced_by
-        # получаем количество страниц поиска, количество одновременного парсинга страниц поиска, количество аккаунтов с ником
-        pages, slices, nicks_count = await get_pages_count(
-            search_base_url, nickname, session, session_id, loop, slice_by
-        )
-        # создаем генератор асинхронных задач
-        pages_gen = page_tasks_generator(
-            search_base_url, nickname, session, session_id, loop, pages
-        )
-        for _ in range(slices):
-            # получаем нужную порцию задач и асинхронно выполняем
-            pages_tasks = list(islice(pages_gen, slice_by))
-            # получаем аккаунты с страниц и добавляем их в full_rows
-            rows_part = await asyncio.gather(*pages_tasks)
-            full_rows.extend(rows_part)
-            # обновляем прогресс
-            progress = len(full_rows) / pages
-            progressbar.set(progress)
+    if output_format == "parquet":
+        # строки пишутся в parquet датасет пачками по мере парсинга
+        full_rows = ParquetSink(nickname, OUTPUT.dataset_dir, OUTPUT.batch_size)
+    elif MEMORY.bounded:
+        # в режиме ограниченной памяти строки сбрасываются в файл на диске
+        full_rows = RowSpool(MEMORY.spool_dir)
+    else:
+        full_rows = []
+    try:
+        if session is None:
+            # async with aiohttp.ClientSession() as session:
+            retry_options = ExponentialRetry(attempts=PARSER.retry_attempt)
+            async with RetryClient(retry_options=retry_options) as session:
+                nicks_count = await parse_pages(
+                    nickname, session, progressbar, loop, control, full_rows
+                )
+        else:
+            nicks_count = await parse_pages(
+                nickname, session, progressbar, loop, control, full_rows, page_slot
+            )
+    except BaseException:
+        # отчет по прерванному запуску не формируется - удаляем буфер строк
+        release_rows(full_rows)
+        raise
+    finally:
+        # дописываем последнюю пачку строк и закрываем файл датасета
+        if isinstance(full_rows, ParquetSink):
+            full_rows.close()
 
     return full_rows, nicks_count
 
 
-async def get_session_id(base_url: str, session: ClientSession) -> str:
+async def parse_pages(
+    nickname: str,
+    session: ClientSession,
+    progressbar: CTkProgressBar,
+    loop: AbstractEventLoop,
+    control: ShutdownControl,
+    full_rows,
+    page_slot: Callable = None,
+) -> int:
     """
-    Функция для получения cookie sessionid
+    Функция для парсинга всех страниц поиска по никнейму
 
     Args:
-        base_url (str): корневой путь для поиска по никам
+        nickname (str): Никнейм д парсинга
         session (ClientSession): асинхронная сессия
+        progressbar (CTkProgressBar): Прогрессбар для обновлен значений
+        loop (AbstractEventLoop): текущий event_loop для асинхронного парсинга
+        control (ShutdownControl): кооперативная остановка парсера
+        full_rows (list | RowSpool | ParquetSink): хранилище собранных строк
+        page_slot (Callable, optional): фабрика контекстного менеджера, ограничивающего парсинг страниц поиска
 
     Returns:
-        session_id (str): cookie sessionid
+        nicks_count (int): количество аккаунтов с заданным ником
     """
-    async with session.get(base_url) as sid_resp:
-        session_id = sid_resp.cookies.get(COOKIE.session_id).value
-
-    return session_id
+    # базовая ссылка на json для поиска по никам
+    search_base_url = URL.search_base_url
+    logger.info("Ищем страницы")
+    # получаем количество страниц поиска в одной асинхронной задаче
+    slice_by = PARSER.sliced_by
+    # получаем количество страниц поиска, количество одновременного парсинга страниц поиска, количество аккаунтов с ником
+    pages, slices, nicks_count = await get_pages_count(
+        search_base_url, nickname, session, loop, slice_by
+    )
+    # создаем генератор асинхронных задач
+    pages_gen = page_tasks_generator(
+        search_base_url, nickname, session, loop, pages, page_slot
+    )
+    for _ in range(slices):
+        # после запроса остановки новые страницы не запускаем
+        if control.stopping:
+            break
+        # получаем нужную порцию задач и асинхронно выполняем
+        pages_tasks = list(islice(pages_gen, slice_by))
+        # получаем аккаунты с страниц и добавляем их в full_rows
+        rows_part = await control.gather(pages_tasks)
+        full_rows.extend(rows_part)
+        del rows_part, pages_tasks
+        # фиксируем собранные профили в хранилище
+        profile_store.commit()
+        # обновляем прогресс
+        progress = len(full_rows) / pages
+        progressbar.set(progress)
+
+    return nicks_count
 
 
 async def get_pages_count(
     search_base_url: str,
     nickname: str,
     session: ClientSession,
-    session_id: str,
     loop: AbstractEventLoop,
     slice_by: int,
 ):
@@ -135,7 +250,6 @@ async def get_pages_count(
         search_base_url (str): корневой путь для поиска по никам
         nickname (str): никнейм для парсинга
         session (ClientSession): асинхронная сессия
-        session_id (str): cookie sessionid
         loop (AbstractEventLoop): текущий event_loop для асинхронного парсинга
         slice_by (int): количество страниц поиска в одной асинхронной задаче
 
@@ -147,7 +261,7 @@ async def get_pages_count(
     """
     # получаем количество страниц и количество профилей
     pages, nicks_count = await get_users_info(
-        search_base_url, nickname, session, session_id, loop, return_pages_count=True
+        search_base_url, nickname, session, loop, return_pages_count=True
     )
 
     logger.info(f"Найдено {pages} страниц")
@@ -162,9 +276,9 @@ def page_tasks_generator(
     search_base_url: str,
     nickname: str,
     session: ClientSession,
-    session_id: str,
     loop: AbstractEventLoop,
     pages: int,
+    page_slot: Callable = None,
 ):
     """
     Генератор асинхронных задач для парсинга страницы с поиском
@@ -173,25 +287,33 @@ def page_tasks_generator(
         search_base_url (str): корневой путь для поиска по никам
         nickname (str): никнейм для парсинга
         session (ClientSession): асинхронная сессия
-        session_id (str): cookie sessionid
         loop (AbstractEventLoop): текущий event_loop для асинхронного парсинга
         pages (int): количество страниц поиска
+        page_slot (Callable, optional): фабрика контекстного менеджера, ограничивающего парсинг страниц поиска
 
     Yeilds:
         Task: асинхронная задача на парсинг страницы поиска
     """
+    page_slot = page_slot or nullcontext
     for page in range(1, pages + 1):
         yield asyncio.create_task(
-            get_users_info(search_base_url, nickname, session, session_id, loop, page),
+            get_page_in_slot(
+                page_slot, search_base_url, nickname, session, loop, page
+            ),
             name=f"page_{page}",
         )
 
 
+async def get_page_in_slot(page_slot: Callable, *args):
+    """Парсинг страницы поиска после получения слота планировщика"""
+    async with page_slot():
+        return await get_users_info(*args)
+
+
 async def get_users_info(
     search_base_url: str,
     nickname: str,
     session: ClientSession,
-    session_id: str,
     loop: AbstractEventLoop,
     page: int = 1,
     return_pages_count: bool = False,
@@ -203,7 +325,6 @@ async def get_users_info(
         search_base_url (str): корневой путь для поиска по никам
         nickname (str): никнейм для парсинга
         session (ClientSession): асинхронная сессия
-        session_id (str): cookie sessionid
         loop (AbstractEventLoop): текущий event_loop для асинхронного парсинга
         page (int, optional): номер страницы поиска. по умолчанию 1
         return_pages_count (bool, optional): при значении True возвращает количество ников и страниц. По умолчнаию False
@@ -216,20 +337,35 @@ async def get_users_info(
         return_pages_count == False
             users_on_page (list(dict)): список с словарями содержащими информацию о пользователях
     """
-    params = {
-        "text": nickname,
-        "filter": "users",
-        "sessionid": session_id,
-        "page": page,
-    }
-
-    content = await get_json_content(session, search_base_url, params)
+    # sessionid берем из единого менеджера сессии
+    session_id = await session_manager.get()
+    content = None
+    if session_id:
+        content = await get_search_content(
+            search_base_url, nickname, session, session_id, page
+        )
+    # сервер отклонил сессию - обновляем sessionid один раз и повторяем запрос
+    if session_manager.is_invalid_response(content):
+        session_id = await session_manager.refresh(session_id)
+        content = None
+        if session_id:
+            content = await get_search_content(
+                search_base_url, nickname, session, session_id, page
+            )
+
+    # страница поиска не получена или сессия снова отклонена - пропускаем ее
+    if not content or session_manager.is_invalid_response(content):
+        logger.error(f"Страница {page} не получена")
+        return (0, 0) if return_pages_count else []
 
     html = content.get("html")
     users_on_page = await get_page_users_info(html, return_pages_count, session, loop)
 
     # получение количества страниц
     if return_pages_count:
+        # по нику ничего не найдено
+        if not users_on_page:
+            return 0, 0
         nicks_count: int = content.get(URL.FIELD.result_count)
         # делим количество всех профилей на количество профилей на одной странице
         pages = nicks_count / users_on_page
@@ -240,3 +376,36 @@ async def get_users_info(
 
     logger.info(f"Страница {page} спаршена")
     return users_on_page
+
+
+async def get_search_content(
+    search_base_url: str,
+    nickname: str,
+    session: ClientSession,
+    session_id: str,
+    page: int,
+):
+    """
+    Функция для получения json страницы поиска
+
+    Args:
+        search_base_url (str): корневой путь для поиска по никам
+        nickname (str): никнейм для парсинга
+        session (ClientSession): асинхронная сессия
+        session_id (str): cookie sessionid
+        page (int): номер страницы поиска
+
+    Returns:
+        content (Union[Dict, None]): json страницы поиска
+    """
+    params = {
+        "text": nickname,
+        "filter": "users",
+        "sessionid": session_id,
+        "page": page,
+    }
+    # cookie должна совпадать с параметром sessionid
+    cookies = {COOKIE.session_id: session_id}
+
+    async with profiler.async_stage("http_search"):
+        return await get_json_content(session, search_base_url, params, cookies)
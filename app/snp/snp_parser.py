@@ -1,12 +1,21 @@
 import asyncio
 import re
 
+from contextlib import nullcontext
+
 from aiohttp import ClientSession
 from bs4 import BeautifulSoup, Tag
 
 from logger.snp_logger import logger, SUCCESS
-from snp.snp_requests import get_page_content, get_json_content
-from snp.snp_settings.settings import EXCEL_FIELD, SELECTOR, URL
+from snp.snp_hedging import hedger
+from snp.snp_profiler import profiler
+from snp.snp_requests import ALIASES_TIMEOUT, get_page_content, get_json_content
+from snp.snp_settings.settings import EXCEL_FIELD, MEMORY, SELECTOR, STORE, URL
+from snp.snp_storage import profile_store
+
+
+# в режиме ограниченной памяти ограничиваем количество одновременно парсящихся профилей
+in_flight = asyncio.Semaphore(MEMORY.max_in_flight) if MEMORY.bounded else nullcontext()
 
 
 async def get_page_users_info(
@@ -31,51 +40,97 @@ async def get_page_users_info(
         return_pages_count == Flase
             rows (List[List[Dict]]): список с данными аккаунтов на стриницe
     """
-    soup = BeautifulSoup(html, "html.parser")
-    user_boxes = soup.select(SELECTOR.user_boxes)
+    with profiler.stage("parse_search_html"):
+        soup = BeautifulSoup(html, "html.parser")
+        user_boxes = soup.select(SELECTOR.user_boxes)
+
+        if return_pages_count:
+            soup.decompose()
+            return len(user_boxes)
 
-    if return_pages_count:
-        return len(user_boxes)
+        # достаем данные из карточек и сразу освобождаем дерево страницы
+        user_cards = [get_user_card(user_box) for user_box in user_boxes]
+        soup.decompose()
+        del soup, user_boxes
 
     user_parse_tasks = [
-        loop.create_task(get_user_info(user_box, session)) for user_box in user_boxes
+        loop.create_task(get_user_info(user_card, session)) for user_card in user_cards
     ]
-    rows = await asyncio.gather(*user_parse_tasks)
+    try:
+        rows = await asyncio.gather(*user_parse_tasks)
+    except asyncio.CancelledError:
+        # при остановке парсера возвращаем уже собранные профили страницы
+        await asyncio.gather(*user_parse_tasks, return_exceptions=True)
+        rows = [
+            task.result()
+            for task in user_parse_tasks
+            if not task.cancelled() and task.exception() is None
+        ]
+        logger.info(f"Со страницы сохранено {len(rows)} из {len(user_cards)} профилей")
 
     return rows
 
 
-async def get_user_info(user: Tag, session: ClientSession) -> dict:
+def get_user_card(user: Tag) -> dict:
     """
-    Функция для парсинга информации пользователя
+    Функция для получения данных из карточки пользователя
 
     Args:
         user (Tag): карточка пользователя
-        session (ClientSession): асинхронная сессия
 
     Returns:
-        return_pages_count == True
-            количество пользователей на странице
-
-        return_pages_count == Flase
-            row (dict): словарь с данными аккаунта
+        card (dict): ссылка на профиль, текущий ник, локация и имя пользователя
     """
     # ищем ссылку в карточке пользователя
     user_a_tag = user.select_one(SELECTOR.user_a_tag)
-    # получаем ссылку на профиль
-    profile_url = user_a_tag.get("href")
-    # получаем текст в карточке пользователя
-    user_text = user.text
     # ищем иконку страны
     img = user.find("img")
+
+    return {
+        # ссылка на профиль
+        "profile_url": user_a_tag.get("href"),
+        "persona": user_a_tag.text.strip(),
+        "location_and_name": get_user_preview_info(user.text, bool(img)),
+    }
+
+
+async def get_user_info(user_card: dict, session: ClientSession) -> dict:
+    """
+    Функция для парсинга информации пользователя
+
+    Args:
+        user_card (dict): данные из карточки пользователя
+        session (ClientSession): асинхронная сессия
+
+    Returns:
+        row (dict): словарь с данными аккаунта
+    """
+    async with in_flight:
+        return await _get_user_info(user_card, session)
+
+
+async def _get_user_info(user_card: dict, session: ClientSession) -> dict:
+    """Парсинг информации пользователя без ограничения одновременных задач"""
+    profile_url = user_card["profile_url"]
+    persona = user_card["persona"]
+    location_and_name = user_card["location_and_name"]
     # получаем id|profiles пользователя
     user_id_path = profile_url.rsplit("https://steamcommunity.com/", 1)[1]
 
-    location_and_name = get_user_preview_info(user_text, bool(img))
-    user_description = await get_user_description(profile_url)
+    # свежий профиль берем из хранилища без запросов к серверу
+    if STORE.enabled:
+        row = profile_store.get_fresh(profile_url)
+        if row:
+            row.update(location_and_name)
+            logger.log(SUCCESS, f"Аккаунт {profile_url} взят из хранилища")
+            return row
+
+    user_description = await get_user_description(session, profile_url)
     user_nicknames = await get_user_nicknames(session, user_id_path)
+    # None - запрос не удался, в отличие от пустого описания или истории ников
+    fetch_failed = user_description is None or user_nicknames is None
     if not user_nicknames:
-        user_nicknames = {EXCEL_FIELD.nickname.format(1): user_a_tag.text.strip()}
+        user_nicknames = {EXCEL_FIELD.nickname.format(1): persona}
 
     # объединяем полученные значения
     row = {
@@ -84,6 +139,9 @@ async def get_user_info(user: Tag, session: ClientSession) -> dict:
         **location_and_name,
         **user_nicknames,
     }
+    # неполные данные не записываем, чтобы не затереть сохраненную историю ников
+    if STORE.enabled and not fetch_failed:
+        profile_store.upsert(row, persona)
 
     logger.log(SUCCESS, f"Получены данные по аккаунту - {profile_url}")
     return row
@@ -127,25 +185,29 @@ def get_user_preview_info(text: str, img_icon: Tag = None) -> dict:
     return res
 
 
-async def get_user_description(user_url: str) -> str:
+async def get_user_description(session: ClientSession, user_url: str) -> str:
     """
     Функция для получения описания указаных в профиле
 
     Args:
+        session (ClientSession): асинхронная сессия
         user_url (str): ссылка на профиль пользователя
 
     Returns:
-        user_description (str): описание в профиле
+        user_description (Union[str, None]): описание в профиле. Пустая строка если описания нет, None если запрос не удался
     """
-    content = await get_page_content(user_url)
-    if not content:
+    async with profiler.async_stage("http_profile"):
+        content = await hedger.run(
+            "profile", lambda: get_page_content(session, user_url)
+        )
+    if content is None:
         return
-    soup = BeautifulSoup(content, "html.parser")
 
-    user_description = soup.select_one(SELECTOR.user_description)
-    if not user_description:
-        return
-    user_description = user_description.text.strip()
+    with profiler.stage("parse_profile_html"):
+        soup = BeautifulSoup(content, "html.parser")
+        user_description = soup.select_one(SELECTOR.user_description)
+        user_description = user_description.text.strip() if user_description else ""
+        soup.decompose()
 
     return user_description
 
@@ -161,13 +223,17 @@ async def get_user_nicknames(
         user_id_path (str): id|profiles пользователя
 
     Returns:
-        nicknames (Union[Dict, None]): словарь с никнеймами пользователя. None если их нет
+        nicknames (Union[Dict, None]): словарь с никнеймами пользователя. Пустой словарь если их нет, None если запрос не удался
     """
     nicknames_base_url = URL.nicknames_base_url
     nicknames_url = nicknames_base_url.format(user_id_path)
 
-    content = await get_json_content(session, nicknames_url)
-    if not content:
+    async with profiler.async_stage("http_aliases"):
+        content = await hedger.run(
+            "aliases",
+            lambda: get_json_content(session, nicknames_url, timeout=ALIASES_TIMEOUT),
+        )
+    if content is None:
         return
 
     nicknames = {}
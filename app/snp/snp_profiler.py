@@ -0,0 +1,259 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager, contextmanager
+
+from logger.snp_logger import logger
+from snp.snp_settings.settings import PROFILING
+
+
+class Profiler:
+    """
+    Сэмплирующий профилировщик парсера
+
+    Отдельный поток с интервалом `interval` снимает стек потока event_loop
+    (on-CPU) и с интервалом `lag_interval` - стеки ожидающих корутин и
+    задержку event_loop. Этапы парсинга, обернутые в `stage` и
+    `async_stage`, дают разбивку по wall и CPU времени.
+    """
+
+    def __init__(self, output_dir: str, interval: float, lag_interval: float):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.lag_interval = lag_interval
+        self.running = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self.cpu_stacks = Counter()
+        self.await_stacks = Counter()
+        # name: [количество, wall, cpu]
+        self.stages = defaultdict(lambda: [0, 0.0, 0.0])
+        # name: [количество, суммарная задержка, wall, активные, начало активности]
+        self.async_stages = defaultdict(lambda: [0, 0.0, 0.0, 0, 0.0])
+        self.lag_samples = []
+        self._stop_event = threading.Event()
+
+    @contextmanager
+    def session(self, loop: asyncio.AbstractEventLoop, enabled: bool = True):
+        """
+        Контекстный менеджер профилирования запуска парсера
+
+        Должен вызываться в потоке, в котором работает `loop`
+
+        Args:
+            loop (AbstractEventLoop): event_loop парсера
+            enabled (bool, optional): при значении False профилирование не выполняется. По умолчанию True
+        """
+        if not enabled or self.running:
+            yield
+            return
+
+        self._reset()
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.started_at = time.time()
+        self._perf_start = time.perf_counter()
+        self.running = True
+        sampler = threading.Thread(target=self._sample, daemon=True)
+        sampler.start()
+        logger.info("Профилирование запущено")
+        try:
+            yield
+        finally:
+            self.running = False
+            self._stop_event.set()
+            sampler.join()
+            self._write()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Синхронный этап: учитываются wall и CPU время"""
+        if not self.running:
+            yield
+            return
+
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            stat = self.stages[name]
+            stat[0] += 1
+            stat[1] += time.perf_counter() - wall
+            stat[2] += time.thread_time() - cpu
+
+    @asynccontextmanager
+    async def async_stage(self, name: str):
+        """
+        Асинхронный этап: учитываются суммарная задержка и wall время
+
+        Одновременные ожидания этапа складываются в суммарную задержку, а в
+        wall время входит только время, когда этап ожидала хотя бы одна задача.
+        CPU время потока за время ожидания принадлежит другим задачам
+        """
+        if not self.running:
+            yield
+            return
+
+        stat = self.async_stages[name]
+        started = time.perf_counter()
+        if not stat[3]:
+            stat[4] = started
+        stat[3] += 1
+        try:
+            yield
+        finally:
+            finished = time.perf_counter()
+            stat[0] += 1
+            stat[1] += finished - started
+            stat[3] -= 1
+            if not stat[3]:
+                stat[2] += finished - stat[4]
+
+    def _sample(self) -> None:
+        """Цикл сэмплирования в отдельном потоке"""
+        next_lag = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is not None:
+                self.cpu_stacks[";".join(frame_stack(frame))] += 1
+            del frame
+
+            if time.perf_counter() >= next_lag:
+                next_lag = time.perf_counter() + self.lag_interval
+                self._sample_tasks()
+                self._sample_lag()
+
+    def _sample_tasks(self) -> None:
+        """Стеки корутин, ожидающих в event_loop"""
+        try:
+            tasks = asyncio.all_tasks(self.loop)
+        except RuntimeError:
+            return
+        for task in tasks:
+            stack = coroutine_stack(task.get_coro())
+            if stack:
+                self.await_stacks[";".join(stack)] += 1
+
+    def _sample_lag(self) -> None:
+        """Задержка выполнения callback в event_loop"""
+        if not self.loop.is_running():
+            return
+        posted = time.perf_counter()
+
+        def callback():
+            self.lag_samples.append(
+                (round(posted - self._perf_start, 3), time.perf_counter() - posted)
+            )
+
+        self.loop.call_soon_threadsafe(callback)
+
+    def _write(self) -> None:
+        """Запись collapsed стеков и разбивки по этапам"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = time.strftime("snp_profile_%Y%m%d_%H%M%S", time.localtime())
+        base_path = os.path.join(self.output_dir, name)
+
+        for suffix, stacks in (("cpu", self.cpu_stacks), ("await", self.await_stacks)):
+            with open(f"{base_path}.{suffix}.folded", "w", encoding="utf-8") as file:
+                for stack, count in stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+
+        lags = sorted(lag for _, lag in self.lag_samples)
+        report = {
+            "duration": time.time() - self.started_at,
+            "interval": self.interval,
+            "stages": {
+                name: {"count": count, "wall": wall, "cpu": cpu}
+                for name, (count, wall, cpu) in self.stages.items()
+            },
+            "async_stages": {
+                name: {"count": count, "latency": latency, "wall": wall}
+                for name, (count, latency, wall, *_) in self.async_stages.items()
+            },
+            "loop_lag": {
+                "samples": len(lags),
+                "p50": lags[len(lags) // 2] if lags else None,
+                "p99": lags[int(len(lags) * 0.99)] if lags else None,
+                "max": lags[-1] if lags else None,
+                "series": self.lag_samples,
+            },
+        }
+        with open(f"{base_path}.json", "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+        for name, (count, wall, cpu) in sorted(self.stages.items()):
+            logger.info(f"Этап {name}: {count} раз, wall {wall:.2f} с, cpu {cpu:.2f} с")
+        for name, (count, latency, wall, *_) in sorted(self.async_stages.items()):
+            logger.info(
+                f"Этап {name}: {count} раз, wall {wall:.2f} с, "
+                f"суммарная задержка {latency:.2f} с"
+            )
+        logger.info(f"Профиль сохранен - {base_path}.*")
+
+
+# кадры, в которых event_loop ждет событий (selector и proactor на Windows)
+IDLE_FRAMES = (
+    "selectors:select",
+    "asyncio.windows_events:select",
+    "asyncio.windows_events:_poll",
+)
+
+
+def frame_label(code, module: str | None = None) -> str:
+    """
+    Подпись кадра стека: модуль:функция
+
+    Полное имя модуля различает одноименные файлы пакетов, например
+    aiohttp.client и aiohttp_retry. Без него используется имя файла
+    """
+    if not module:
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+def frame_module(frame) -> str | None:
+    """Полное имя модуля кадра. None если кадра уже нет"""
+    if frame is None:
+        return
+
+    return frame.f_globals.get("__name__")
+
+
+def frame_stack(frame) -> list:
+    """Стек потока от внешнего кадра к внутреннему"""
+    stack = []
+    while frame is not None:
+        stack.append(frame_label(frame.f_code, frame_module(frame)))
+        frame = frame.f_back
+    stack.reverse()
+    # поток event_loop ждет событий в selector - помечаем простой
+    if stack and stack[-1] in IDLE_FRAMES:
+        stack.append("[idle]")
+
+    return stack
+
+
+def coroutine_stack(coro) -> list:
+    """Цепочка ожидающих корутин задачи от внешней к внутренней"""
+    stack = []
+    while coro is not None and len(stack) < 100:
+        code = getattr(coro, "cr_code", None) or getattr(coro, "gi_code", None)
+        if code is None:
+            # дошли до Future или другого awaitable
+            stack.append(f"[{type(coro).__name__}]")
+            break
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        stack.append(frame_label(code, frame_module(frame)))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+
+    return stack
+
+
+# единый профилировщик для всех задач парсера
+profiler = Profiler(PROFILING.output_dir, PROFILING.interval, PROFILING.lag_interval)
@@ -0,0 +1,83 @@
+import pandas as pd
+
+from openpyxl import Workbook
+
+from logger.snp_logger import logger
+from snp.snp_dataset import ParquetSink
+from snp.snp_profiler import profiler
+from snp.snp_spool import RowSpool, release_rows
+
+
+def create_report(rows_list, users_count: int, full_path: str | None) -> None:
+    """
+    Функция для формирования отчета в выбранном формате
+
+    Args:
+        rows_list (List[List[Dict]] | RowSpool | ParquetSink): собранные строки
+        users_count (int): количество аккаунтов с заданным ником
+        full_path (Union[str, None]): путь до файла xlsx отчета. не используется для parquet
+    """
+    # строки уже записаны в датасет во время парсинга
+    if isinstance(rows_list, ParquetSink):
+        logger.info(f"В датасет записано {rows_list.rows_count} из {users_count} строк")
+        logger.info(f"Файл датасета {rows_list.path} - создан")
+        return
+
+    try:
+        create_xlsx(rows_list, users_count, full_path)
+    finally:
+        release_rows(rows_list)
+
+
+def create_xlsx(rows_list: list, users_count: int, full_path: str) -> None:
+    """
+    Функция для формирования отчета xlsx
+
+    Args:
+        rows_list (List[List[Dict]]): список с данными аккаунтов на стриницу
+        users_count (int): количество аккаунтов с заданным ником
+        full_path (str): путь до файла отчета
+    """
+    logger.info("Формирование отчета...")
+    if isinstance(rows_list, RowSpool):
+        with profiler.stage("report_xlsx"):
+            create_xlsx_from_spool(rows_list, users_count, full_path)
+        return
+
+    with profiler.stage("report_dataframe"):
+        df = pd.DataFrame()
+        for rows in rows_list:
+            new_df = pd.DataFrame(rows)
+            df = pd.concat([df, new_df], ignore_index=True)
+
+    # logger.info("Удаление дубликатов")
+    # df.drop_duplicates(inplace=True)
+    logger.info(f"Отчет содержит {len(df)} из {users_count} строк")
+    with profiler.stage("report_xlsx"):
+        df.to_excel(full_path, index=False)
+    logger.info(f"Отчет {full_path} - создан")
+
+
+def create_xlsx_from_spool(spool: RowSpool, users_count: int, full_path: str) -> None:
+    """
+    Функция для потоковой записи отчета xlsx из буфера на диске
+
+    Строки читаются из буфера по одной странице и сразу пишутся в файл,
+    поэтому отчет не собирается в памяти целиком
+
+    Args:
+        spool (RowSpool): буфер с данными аккаунтов
+        users_count (int): количество аккаунтов с заданным ником
+        full_path (str): путь до файла отчета
+    """
+    columns = spool.columns()
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(columns)
+    for rows in spool:
+        for row in rows:
+            ws.append([row.get(column) for column in columns])
+
+    logger.info(f"Отчет содержит {spool.rows_count} из {users_count} строк")
+    wb.save(full_path)
+    logger.info(f"Отчет {full_path} - создан")
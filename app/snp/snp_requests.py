@@ -1,34 +1,56 @@
-from aiohttp import ClientSession, ContentTypeError
-from aiohttp_retry import RetryClient, ExponentialRetry
-from asyncio.exceptions import CancelledError
+import asyncio
 
-from snp.snp_logic import logger
-from snp.snp_settings.settings import PARSER
+from aiohttp import ClientSession, ClientTimeout, ContentTypeError
 
+from logger.snp_logger import logger
+from snp.snp_settings.settings import TIMEOUT
 
-async def get_json_content(session: ClientSession, url: str, params: dict = {}):
+
+# дедлайны подключения и чтения ответа для каждого типа запросов
+SEARCH_TIMEOUT = ClientTimeout(
+    total=None, sock_connect=TIMEOUT.search_connect, sock_read=TIMEOUT.search_read
+)
+PROFILE_TIMEOUT = ClientTimeout(
+    total=None, sock_connect=TIMEOUT.profile_connect, sock_read=TIMEOUT.profile_read
+)
+ALIASES_TIMEOUT = ClientTimeout(
+    total=None, sock_connect=TIMEOUT.aliases_connect, sock_read=TIMEOUT.aliases_read
+)
+
+
+async def get_json_content(
+    session: ClientSession,
+    url: str,
+    params: dict = {},
+    cookies: dict = None,
+    timeout: ClientTimeout = SEARCH_TIMEOUT,
+):
     try:
-        async with session.get(url, params=params) as resp:
+        async with session.get(
+            url, params=params, cookies=cookies, timeout=timeout
+        ) as resp:
             content = await resp.json()
     except ContentTypeError:
         logger.error(f"Ссылки {url} - нет")
         return
-    except CancelledError:
-        await session.close()
+    except asyncio.TimeoutError:
+        logger.error(f"Превышено время ожидания ответа {url}")
+        return
 
     return content
 
 
-async def get_page_content(url: str):
+async def get_page_content(
+    session: ClientSession, url: str, timeout: ClientTimeout = PROFILE_TIMEOUT
+):
     try:
-        retry_options = ExponentialRetry(attempts=PARSER.retry_attempt)
-        async with RetryClient(retry_options=retry_options) as session:
-            async with session.get(url) as resp:
-                content = await resp.text()
+        async with session.get(url, timeout=timeout) as resp:
+            content = await resp.text()
     except ContentTypeError:
         logger.error(f"Ссылки {url} - нет")
         return
-    except CancelledError:
-        await session.close()
+    except asyncio.TimeoutError:
+        logger.error(f"Превышено время ожидания ответа {url}")
+        return
 
     return content
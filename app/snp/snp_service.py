@@ -0,0 +1,344 @@
+import asyncio
+import os
+import time
+import uuid
+
+from collections import deque
+from contextlib import asynccontextmanager
+
+from aiohttp import ClientConnectionError, web
+from aiohttp_retry import ExponentialRetry, RetryClient
+
+from logger.snp_logger import logger
+from snp.snp_dataset import ParquetSink, dataset_available
+from snp.snp_logic import schedule_run_budget, start_parsing
+from snp.snp_report import create_report
+from snp.snp_settings.settings import OUTPUT, PARSER, SERVICE
+from snp.snp_shutdown import ShutdownControl
+from snp.snp_spool import RowSpool, release_rows
+
+
+class FairScheduler:
+    """
+    Справедливое распределение слотов парсинга страниц между задачами
+
+    Одновременно парсится не больше `max_concurrent` страниц поиска на все
+    задачи. Освободившийся слот отдается задачам по кругу, поэтому ник с
+    большим количеством страниц не задерживает небольшие задачи.
+    """
+
+    def __init__(self, max_concurrent: int):
+        self.free = max_concurrent
+        self.waiters: dict[str, deque] = {}
+        # очередь задач для выдачи слотов по кругу
+        self.order = deque()
+
+    @asynccontextmanager
+    async def slot(self, job_id: str):
+        """Контекстный менеджер слота парсинга страницы для задачи `job_id`"""
+        await self._acquire(job_id)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, job_id: str) -> None:
+        if self.free > 0 and not self.order:
+            self.free -= 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        if job_id not in self.waiters:
+            self.waiters[job_id] = deque()
+            self.order.append(job_id)
+        self.waiters[job_id].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # слот успели выдать до отмены - возвращаем его
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        while self.order:
+            job_id = self.order.popleft()
+            queue = self.waiters[job_id]
+            # пропускаем ожидания отмененных страниц
+            while queue and queue[0].done():
+                queue.popleft()
+            if not queue:
+                del self.waiters[job_id]
+                continue
+
+            queue.popleft().set_result(None)
+            if queue:
+                self.order.append(job_id)
+            else:
+                del self.waiters[job_id]
+            return
+
+        self.free += 1
+
+
+class Job:
+    """Задача парсинга одного никнейма"""
+
+    def __init__(self, nickname: str, max_seconds: float, output_format: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.nickname = nickname
+        self.max_seconds = max_seconds
+        self.output_format = output_format
+        self.status = "running"
+        self.progress = 0.0
+        self.nicks_count = None
+        self.rows_count = None
+        self.result_path = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.control = ShutdownControl()
+        self.task: asyncio.Task | None = None
+
+    def set(self, value: float) -> None:
+        """Обновление прогресса. Повторяет интерфейс CTkProgressBar.set"""
+        self.progress = value
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "nickname": self.nickname,
+            "format": self.output_format,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "nicks_count": self.nicks_count,
+            "rows_count": self.rows_count,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class CrawlService:
+    """
+    Сервис парсинга с HTTP/JSON API
+
+    Все задачи выполняются в одном event_loop и используют общий пул
+    соединений, планировщик страниц, менеджер sessionid и хранилище профилей.
+    Завершенные задачи и их xlsx отчеты удаляются через `job_ttl` секунд.
+    """
+
+    def __init__(self, results_dir: str, max_pages: int, job_ttl: int):
+        self.results_dir = results_dir
+        self.job_ttl = job_ttl
+        self.scheduler = FairScheduler(max_pages)
+        self.jobs: dict[str, Job] = {}
+        self.session = None
+        self.evict_task: asyncio.Task | None = None
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/jobs", self.create_job)
+        app.router.add_get("/jobs", self.list_jobs)
+        app.router.add_get("/jobs/{job_id}", self.get_job)
+        app.router.add_get("/jobs/{job_id}/result", self.get_result)
+        app.router.add_delete("/jobs/{job_id}", self.stop_job)
+        app.on_startup.append(self.on_startup)
+        app.on_cleanup.append(self.on_cleanup)
+
+        return app
+
+    async def on_startup(self, app: web.Application) -> None:
+        # общий пул соединений для всех задач
+        retry_options = ExponentialRetry(attempts=PARSER.retry_attempt)
+        self.session = RetryClient(retry_options=retry_options)
+        os.makedirs(self.results_dir, exist_ok=True)
+        if self.job_ttl:
+            self.evict_task = asyncio.create_task(self.evict_loop())
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        if self.evict_task:
+            self.evict_task.cancel()
+        # мягко останавливаем задачи, чтобы сохранить собранные профили
+        tasks = []
+        for job in self.jobs.values():
+            if job.task and not job.task.done():
+                job.control.request_stop()
+                tasks.append(job.task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.session.close()
+
+    async def create_job(self, request: web.Request) -> web.Response:
+        """POST /jobs {"nickname": str, "max_seconds": float, "format": str}"""
+        try:
+            data = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="Тело запроса должно быть json")
+        if not isinstance(data, dict):
+            raise web.HTTPBadRequest(text="Тело запроса должно быть json объектом")
+
+        nickname = str(data.get("nickname") or "").strip()
+        output_format = data.get("format") or OUTPUT.format
+        max_seconds = data.get("max_seconds")
+        if not nickname:
+            raise web.HTTPBadRequest(text="Никнейм не может быть пустой")
+        if output_format not in ("xlsx", "parquet"):
+            raise web.HTTPBadRequest(text="Формат должен быть xlsx или parquet")
+        if output_format == "parquet" and not dataset_available():
+            raise web.HTTPBadRequest(text="Для вывода в parquet установите pyarrow")
+        # bool - подкласс int, true не должен считаться лимитом в 1 секунду
+        if max_seconds is not None and (
+            not isinstance(max_seconds, (int, float))
+            or isinstance(max_seconds, bool)
+            or not 0 < max_seconds < float("inf")
+        ):
+            raise web.HTTPBadRequest(
+                text="Лимит времени должен быть положительным числом"
+            )
+
+        job = Job(nickname, max_seconds, output_format)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self.run_job(job), name=f"job_{job.id}")
+        logger.info(f"Задача {job.id} - {nickname} - создана")
+
+        return web.json_response(job.to_dict(), status=201)
+
+    async def list_jobs(self, request: web.Request) -> web.Response:
+        return web.json_response([job.to_dict() for job in self.jobs.values()])
+
+    async def get_job(self, request: web.Request) -> web.Response:
+        return web.json_response(self._get_job(request).to_dict())
+
+    async def get_result(self, request: web.Request) -> web.StreamResponse:
+        job = self._get_job(request)
+        if job.status == "running":
+            raise web.HTTPConflict(text="Задача еще выполняется")
+        if not job.result_path or not os.path.exists(job.result_path):
+            raise web.HTTPNotFound(text="Результат задачи не создан")
+
+        return web.FileResponse(
+            job.result_path,
+            headers={
+                "Content-Disposition": f'attachment; filename="{job.id}.{job.output_format}"'
+            },
+        )
+
+    async def stop_job(self, request: web.Request) -> web.Response:
+        """
+        Мягкая остановка задачи с сохранением собранных строк
+
+        Завершенная задача удаляется вместе с xlsx отчетом
+        """
+        job = self._get_job(request)
+        if job.status != "running":
+            self.remove_job(job)
+            return web.Response(status=204)
+        job.control.request_stop()
+
+        return web.json_response(job.to_dict())
+
+    async def evict_loop(self) -> None:
+        """Периодическое удаление устаревших задач"""
+        while True:
+            await asyncio.sleep(min(self.job_ttl, 60))
+            self.evict_expired()
+
+    def evict_expired(self) -> None:
+        """Удаление задач, завершенных раньше `job_ttl` секунд назад, и их отчетов"""
+        expired_at = time.time() - self.job_ttl
+        for job in list(self.jobs.values()):
+            if job.finished_at and job.finished_at < expired_at:
+                self.remove_job(job)
+
+        # отчеты, оставшиеся от прошлых запусков сервиса
+        job_paths = {job.result_path for job in self.jobs.values()}
+        for name in os.listdir(self.results_dir):
+            path = os.path.join(self.results_dir, name)
+            if (
+                name.endswith(".xlsx")
+                and path not in job_paths
+                and os.path.getmtime(path) < expired_at
+            ):
+                os.remove(path)
+
+    def remove_job(self, job: Job) -> None:
+        """Удаление задачи и ее xlsx отчета. parquet файл остается в общем датасете"""
+        self.jobs.pop(job.id, None)
+        if job.output_format == "xlsx" and job.result_path:
+            if os.path.exists(job.result_path):
+                os.remove(job.result_path)
+        logger.info(f"Задача {job.id} - {job.nickname} - удалена")
+
+    def _get_job(self, request: web.Request) -> Job:
+        job = self.jobs.get(request.match_info["job_id"])
+        if job is None:
+            raise web.HTTPNotFound(text="Задача не найдена")
+
+        return job
+
+    async def run_job(self, job: Job) -> None:
+        """Выполнение задачи в общем event_loop"""
+        loop = asyncio.get_running_loop()
+        budget_handle = schedule_run_budget(loop, job.control, job.max_seconds)
+        try:
+            rows, job.nicks_count = await start_parsing(
+                job.nickname,
+                job,
+                loop,
+                job.control,
+                job.output_format,
+                session=self.session,
+                page_slot=lambda: self.scheduler.slot(job.id),
+            )
+            await self.save_result(job, rows)
+            job.status = "stopped" if job.control.stopping else "done"
+            if job.status == "done":
+                # по нику без результатов страниц нет и прогресс не обновлялся
+                job.set(1.0)
+        except ClientConnectionError:
+            job.status = "failed"
+            job.error = "Нет подключения к интернету или сервер недоступен"
+        except Exception as e:
+            logger.exception(f"Задача {job.id} завершилась с ошибкой")
+            job.status = "failed"
+            job.error = repr(e)
+        finally:
+            if budget_handle:
+                budget_handle.cancel()
+            job.finished_at = time.time()
+
+        logger.info(f"Задача {job.id} - {job.nickname} - {job.status}")
+
+    async def save_result(self, job: Job, rows) -> None:
+        """Формирование результата задачи"""
+        if isinstance(rows, ParquetSink):
+            job.rows_count = rows.rows_count
+            job.result_path = rows.path if rows.rows_count else None
+            return
+
+        job.rows_count = (
+            rows.rows_count
+            if isinstance(rows, RowSpool)
+            else sum(len(page_rows) for page_rows in rows)
+        )
+        if not job.rows_count:
+            release_rows(rows)
+            return
+        job.result_path = os.path.join(self.results_dir, f"{job.id}.xlsx")
+        # отчет формируется в отдельном потоке, чтобы не блокировать другие задачи
+        await asyncio.get_running_loop().run_in_executor(
+            None, create_report, rows, job.nicks_count, job.result_path
+        )
+
+
+def run_service(host: str = SERVICE.host, port: int = SERVICE.port) -> None:
+    """
+    Функция для запуска сервиса парсинга
+
+    Args:
+        host (str, optional): адрес сервиса. По умолчанию [service].host
+        port (int, optional): порт сервиса. По умолчанию [service].port
+    """
+    service = CrawlService(SERVICE.results_dir, SERVICE.max_pages, SERVICE.job_ttl)
+    logger.info(f"Сервис запущен - http://{host}:{port}")
+    web.run_app(service.build_app(), host=host, port=port, print=None)
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import time
+
+from email.utils import parsedate_to_datetime
+from http.cookies import Morsel
+
+from aiohttp import ClientSession, DummyCookieJar
+
+from logger.snp_logger import logger
+from snp.snp_profiler import profiler
+from snp.snp_requests import SEARCH_TIMEOUT
+from snp.snp_settings.settings import COOKIE, SESSION, URL
+
+
+class SessionIdManager:
+    """
+    Менеджер cookie sessionid
+
+    Хранит cookie вместе с наблюдаемым временем жизни в файле, чтобы
+    переиспользовать ее между запусками и никнеймами. Обновление cookie
+    выполняется под блокировкой: пока один запрос получает новый sessionid,
+    остальные ждут и получают уже обновленное значение.
+    """
+
+    def __init__(self, cache_file: str, default_ttl: int):
+        self.cache_file = cache_file
+        self.default_ttl = default_ttl
+        self.session_id: str | None = None
+        # время получения cookie и время, после которого она считается устаревшей
+        self.obtained_at: float = 0
+        self.expires_at: float = 0
+        # наблюдаемое время жизни cookie (сек). None - пока не известно
+        self.lifetime: float | None = None
+        self._lock = asyncio.Lock()
+        self._load()
+
+    def is_valid(self) -> bool:
+        """Проверка, что сохраненная cookie еще не устарела"""
+        return bool(self.session_id) and time.time() < self.expires_at
+
+    async def get(self) -> str | None:
+        """
+        Функция для получения актуального sessionid
+
+        Returns:
+            session_id (Union[str, None]): cookie sessionid. None если ее не удалось получить
+        """
+        # если идет обновление - ждем его завершения
+        async with self._lock:
+            if not self.is_valid():
+                # cookie дожила до конца срока без отказа - срок можно увеличить
+                if self.session_id and self.lifetime:
+                    self.lifetime = min(self.lifetime * 2, self.default_ttl)
+                await self._fetch()
+
+            return self.session_id
+
+    async def refresh(self, stale_id: str) -> str | None:
+        """
+        Функция для обновления sessionid после ответа о невалидной сессии
+
+        Args:
+            stale_id (str): sessionid, с которым сервер отклонил запрос
+
+        Returns:
+            session_id (Union[str, None]): обновленная cookie sessionid. None если ее не удалось получить
+        """
+        async with self._lock:
+            # другой запрос уже обновил cookie, пока мы ждали блокировку
+            if self.session_id != stale_id and self.is_valid():
+                return self.session_id
+
+            # запоминаем сколько прожила cookie до отказа сервера
+            if stale_id and stale_id == self.session_id and self.obtained_at:
+                self.lifetime = time.time() - self.obtained_at
+                logger.info(
+                    f"Сессия устарела через {self.lifetime:.0f} секунд, обновляем"
+                )
+            await self._fetch()
+
+            return self.session_id
+
+    @staticmethod
+    def is_invalid_response(content: dict | None) -> bool:
+        """
+        Проверка ответа поиска на отказ из-за невалидной сессии
+
+        Args:
+            content (Union[Dict, None]): json ответа страницы поиска
+
+        Returns:
+            bool: True если сессию нужно обновить
+        """
+        # ответа нет - это ошибка запроса, а не отказ в сессии
+        if not isinstance(content, dict):
+            return False
+
+        return content.get(URL.FIELD.success, 1) != 1
+
+    async def _fetch(self) -> None:
+        """
+        Получение новой cookie sessionid с сервера
+
+        Запрос выполняется отдельным клиентом без cookie: клиенту, у которого
+        уже есть sessionid, сервер может не выдать новую
+        """
+        try:
+            async with profiler.async_stage("http_session_id"):
+                async with ClientSession(
+                    cookie_jar=DummyCookieJar(), timeout=SEARCH_TIMEOUT
+                ) as sid_session:
+                    async with sid_session.get(URL.search_base_url) as sid_resp:
+                        morsel = sid_resp.cookies.get(COOKIE.session_id)
+        except asyncio.TimeoutError:
+            logger.error("Не удалось получить cookie sessionid")
+            return
+
+        if morsel is None:
+            logger.error("Сервер не выдал cookie sessionid")
+            return
+
+        self.session_id = morsel.value
+        self.obtained_at = time.time()
+        self.expires_at = self.obtained_at + self._cookie_ttl(morsel)
+        self._save()
+
+    def _cookie_ttl(self, morsel: Morsel) -> float:
+        """Время жизни cookie: из ответа сервера, наблюдаемое или по умолчанию"""
+        if morsel["max-age"]:
+            return float(morsel["max-age"])
+        if morsel["expires"]:
+            expires = parsedate_to_datetime(morsel["expires"]).timestamp()
+            return max(expires - time.time(), 0)
+        if self.lifetime:
+            return min(self.lifetime, self.default_ttl)
+
+        return self.default_ttl
+
+    def _load(self) -> None:
+        """Чтение сохраненной cookie из файла"""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            logger.error(f"Не удалось прочитать файл сессии {self.cache_file}")
+            return
+
+        self.session_id = data.get("session_id")
+        self.obtained_at = data.get("obtained_at", 0)
+        self.expires_at = data.get("expires_at", 0)
+        self.lifetime = data.get("lifetime")
+
+    def _save(self) -> None:
+        """Сохранение cookie в файл"""
+        data = {
+            "session_id": self.session_id,
+            "obtained_at": self.obtained_at,
+            "expires_at": self.expires_at,
+            "lifetime": self.lifetime,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+            with open(self.cache_file, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+        except OSError:
+            logger.error(f"Не удалось сохранить файл сессии {self.cache_file}")
+
+
+# единый менеджер sessionid для всех задач парсера
+session_manager = SessionIdManager(SESSION.cache_file, SESSION.default_ttl)
@@ -29,6 +29,160 @@ class COOKIE:
     session_id: str = parser_config["cookies"]["session_id"]
 
 
+@dataclass
+class SESSION:
+    """
+    хранение cookie sessionid между запусками
+
+    fields:
+        cache_file: str - файл, в котором сохраняется cookie sessionid и ее время жизни
+        default_ttl: int - время жизни cookie (сек), если сервер его не указал и оно еще не наблюдалось
+    """
+
+    cache_file: str = parser_config["session"]["cache_file"]
+    default_ttl: int = int(parser_config["session"]["default_ttl"])
+
+
+@dataclass
+class STORE:
+    """
+    локальное хранилище собранных профилей
+
+    fields:
+        enabled: bool - сохранять профили в хранилище и брать из него свежие профили при парсинге
+        db_path: str - файл базы данных SQLite
+        max_age: int - время (сек), после которого профиль считается устаревшим и парсится заново
+    """
+
+    enabled: bool = parser_config.getboolean("store", "enabled")
+    db_path: str = parser_config["store"]["db_path"]
+    max_age: int = int(parser_config["store"]["max_age"])
+
+
+@dataclass
+class MEMORY:
+    """
+    режим ограниченной памяти для ников с большим количеством аккаунтов
+
+    fields:
+        bounded: bool - включить режим ограниченной памяти
+        max_in_flight: int - максимальное количество одновременно парсящихся профилей
+        spool_dir: str - папка для временного файла с собранными строками. пусто - системная временная папка
+    """
+
+    bounded: bool = parser_config.getboolean("memory", "bounded")
+    max_in_flight: int = int(parser_config["memory"]["max_in_flight"])
+    spool_dir: str = parser_config["memory"]["spool_dir"]
+
+
+@dataclass
+class TIMEOUT:
+    """
+    дедлайны запросов (сек)
+
+    fields:
+        search_connect: float - подключение для страницы поиска
+        search_read: float - чтение ответа страницы поиска
+        profile_connect: float - подключение для страницы профиля
+        profile_read: float - чтение ответа страницы профиля
+        aliases_connect: float - подключение для истории ников
+        aliases_read: float - чтение ответа истории ников
+        run_budget: float - общее время работы парсера. 0 - без ограничения
+    """
+
+    search_connect: float = float(parser_config["timeouts"]["search_connect"])
+    search_read: float = float(parser_config["timeouts"]["search_read"])
+    profile_connect: float = float(parser_config["timeouts"]["profile_connect"])
+    profile_read: float = float(parser_config["timeouts"]["profile_read"])
+    aliases_connect: float = float(parser_config["timeouts"]["aliases_connect"])
+    aliases_read: float = float(parser_config["timeouts"]["aliases_read"])
+    run_budget: float = float(parser_config["timeouts"]["run_budget"])
+
+
+@dataclass
+class SHUTDOWN:
+    """
+    остановка парсера
+
+    fields:
+        drain_seconds: float - время (сек), которое дается текущим запросам на завершение после остановки
+    """
+
+    drain_seconds: float = float(parser_config["shutdown"]["drain_seconds"])
+
+
+@dataclass
+class HEDGING:
+    """
+    дублирование медленных запросов профиля и истории ников
+
+    fields:
+        enabled: bool - включить дублирование запросов
+        percentile: float - перцентиль длительности запроса, после которого отправляется копия
+        min_samples: int - минимальное количество завершенных запросов для расчета перцентиля
+        max_rate: float - максимальная доля дублированных запросов
+    """
+
+    enabled: bool = parser_config.getboolean("hedging", "enabled")
+    percentile: float = float(parser_config["hedging"]["percentile"])
+    min_samples: int = int(parser_config["hedging"]["min_samples"])
+    max_rate: float = float(parser_config["hedging"]["max_rate"])
+
+
+@dataclass
+class OUTPUT:
+    """
+    формат вывода результатов
+
+    fields:
+        format: str - формат вывода: xlsx - отчет на каждый запуск, parquet - общий датасет для всех запусков
+        dataset_dir: str - папка parquet датасета. запуски добавляются в партиции nickname=<ник>/date=<дата>
+        batch_size: int - количество строк в одной пачке записи в parquet
+    """
+
+    format: str = parser_config["output"]["format"]
+    dataset_dir: str = parser_config["output"]["dataset_dir"]
+    batch_size: int = int(parser_config["output"]["batch_size"])
+
+
+@dataclass
+class PROFILING:
+    """
+    профилирование парсера
+
+    fields:
+        enabled: bool - включить профилирование
+        output_dir: str - папка для collapsed стеков (*.folded) и разбивки по этапам (*.json)
+        interval: float - интервал сэмплирования стека event_loop (сек)
+        lag_interval: float - интервал сэмплирования ожидающих корутин и задержки event_loop (сек)
+    """
+
+    enabled: bool = parser_config.getboolean("profiling", "enabled")
+    output_dir: str = parser_config["profiling"]["output_dir"]
+    interval: float = float(parser_config["profiling"]["interval"])
+    lag_interval: float = float(parser_config["profiling"]["lag_interval"])
+
+
+@dataclass
+class SERVICE:
+    """
+    сервис парсинга с HTTP/JSON API
+
+    fields:
+        host: str - адрес сервиса
+        port: int - порт сервиса
+        max_pages: int - максимальное количество одновременно парсящихся страниц поиска на все задачи
+        results_dir: str - папка для xlsx отчетов задач
+        job_ttl: int - время (сек) хранения завершенных задач и их xlsx отчетов. 0 - хранить до перезапуска сервиса
+    """
+
+    host: str = parser_config["service"]["host"]
+    port: int = int(parser_config["service"]["port"])
+    max_pages: int = int(parser_config["service"]["max_pages"])
+    results_dir: str = parser_config["service"]["results_dir"]
+    job_ttl: int = int(parser_config["service"]["job_ttl"])
+
+
 @dataclass
 class URL:
     """
@@ -50,11 +204,13 @@ class URL:
         fields:
             html: str - поле для URL.search_base_url хранящее html с карточками пользователей
             result_count: str - поле для URL.search_base_urlхранящее количества найденых ников
+            success: str - поле для URL.search_base_url хранящее статус ответа
             nickname: str - поле для URL.nicknames_base_url хранящее ник в истории ников
         """
 
         html: str = parser_config["json_fields"]["html"]
         result_count: str = parser_config["json_fields"]["result_count"]
+        success: str = parser_config["json_fields"]["success"]
         nickname: str = parser_config["json_fields"]["nickname"]
 
 
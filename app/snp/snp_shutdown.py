@@ -0,0 +1,69 @@
+import asyncio
+
+from logger.snp_logger import logger
+from snp.snp_settings.settings import SHUTDOWN
+
+
+class ShutdownControl:
+    """
+    Кооперативная остановка одного запуска парсера
+
+    После запроса остановки новые страницы не запускаются, текущим запросам
+    дается `drain_seconds` на завершение, оставшиеся задачи отменяются, а
+    собранные строки возвращаются для отчета.
+    """
+
+    def __init__(self, drain_seconds: float = SHUTDOWN.drain_seconds):
+        self.drain_seconds = drain_seconds
+        self._event = asyncio.Event()
+
+    @property
+    def stopping(self) -> bool:
+        return self._event.is_set()
+
+    def request_stop(self) -> None:
+        """Запрос остановки. Вызывается в потоке event_loop"""
+        if not self.stopping:
+            logger.info("Остановка парсера, завершаем текущие запросы...")
+        self._event.set()
+
+    async def gather(self, tasks: list) -> list:
+        """
+        Функция для ожидания задач с учетом остановки
+
+        Args:
+            tasks (List[Task]): задачи парсинга страниц
+
+        Returns:
+            results (list): результаты завершившихся задач в исходном порядке
+        """
+        stop_task = asyncio.create_task(self._event.wait())
+        pending = set(tasks)
+        try:
+            while pending and not self.stopping:
+                _, pending = await asyncio.wait(
+                    pending | {stop_task}, return_when=asyncio.FIRST_COMPLETED
+                )
+                pending.discard(stop_task)
+        finally:
+            stop_task.cancel()
+
+        if pending:
+            # даем текущим запросам время завершиться
+            _, pending = await asyncio.wait(pending, timeout=self.drain_seconds)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if pending:
+                logger.info(f"Отменено {len(pending)} незавершенных задач")
+
+        results = []
+        for task in tasks:
+            if task.cancelled():
+                continue
+            # ошибки задач пробрасываем как и asyncio.gather
+            if task.exception():
+                raise task.exception()
+            results.append(task.result())
+
+        return results
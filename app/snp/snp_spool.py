@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+
+from snp.snp_settings.settings import EXCEL_FIELD
+from snp.snp_storage import get_row_nicknames
+
+
+class RowSpool:
+    """
+    Буфер собранных строк на диске
+
+    Заменяет список `full_rows` в режиме ограниченной памяти: каждая страница
+    поиска записывается в файл одной json строкой и читается обратно при
+    формировании отчета.
+    """
+
+    def __init__(self, spool_dir: str | None = None):
+        self.file = tempfile.NamedTemporaryFile(
+            mode="w+",
+            encoding="utf-8",
+            prefix="snp_rows_",
+            suffix=".jsonl",
+            dir=spool_dir or None,
+            delete=False,
+        )
+        self.pages = 0
+        self.rows_count = 0
+        # максимальное количество ников у одного аккаунта - для заголовков отчета
+        self.max_nicknames = 0
+
+    def __len__(self) -> int:
+        return self.pages
+
+    def extend(self, rows_parts: list) -> None:
+        """
+        Функция для записи страниц с аккаунтами в буфер
+
+        Args:
+            rows_parts (List[List[Dict]]): список с данными аккаунтов на стриницу
+        """
+        for rows in rows_parts:
+            self.file.write(json.dumps(rows, ensure_ascii=False))
+            self.file.write("\n")
+            self.pages += 1
+            self.rows_count += len(rows)
+            for row in rows:
+                nicknames = len(get_row_nicknames(row))
+                self.max_nicknames = max(self.max_nicknames, nicknames)
+        self.file.flush()
+
+    def __iter__(self):
+        """Чтение страниц с аккаунтами из буфера"""
+        self.file.flush()
+        with open(self.file.name, encoding="utf-8") as file:
+            for line in file:
+                yield json.loads(line)
+
+    def columns(self) -> list:
+        """Заголовки отчета в порядке столбцов строки аккаунта"""
+        columns = [
+            EXCEL_FIELD.url,
+            EXCEL_FIELD.description,
+            EXCEL_FIELD.location,
+            EXCEL_FIELD.name,
+        ]
+        columns.extend(
+            EXCEL_FIELD.nickname.format(i) for i in range(1, self.max_nicknames + 1)
+        )
+
+        return columns
+
+    def close(self) -> None:
+        """Удаление файла буфера. Повторный вызов ничего не делает"""
+        self.file.close()
+        if os.path.exists(self.file.name):
+            os.remove(self.file.name)
+
+
+def release_rows(rows) -> None:
+    """
+    Функция для удаления буфера строк, по которому не будет сформирован отчет
+
+    Args:
+        rows (List[List[Dict]] | RowSpool | ParquetSink | None): собранные строки
+    """
+    if isinstance(rows, RowSpool):
+        rows.close()
@@ -0,0 +1,275 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from logger.snp_logger import logger
+from snp.snp_settings.settings import EXCEL_FIELD, STORE
+
+
+# версия схемы хранилища в PRAGMA user_version
+SCHEMA_VERSION = 1
+
+
+class ProfileStore:
+    """
+    Локальное хранилище собранных профилей
+
+    Профили хранятся в SQLite, текущие ники, имена и история ников
+    проиндексированы полнотекстовым индексом FTS5 с триграммами, поэтому
+    поиск по нику выполняется без обращения к серверу.
+    """
+
+    def __init__(self, db_path: str, max_age: int):
+        self.db_path = db_path
+        self.max_age = max_age
+        self._conn: sqlite3.Connection | None = None
+        # соединение используется и из потока парсера, и из потока GUI
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Ленивое подключение к базе и создание таблиц"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_tables()
+
+        return self._conn
+
+    def _create_tables(self) -> None:
+        """
+        Создание таблицы профилей и полнотекстового индекса
+
+        Строка индекса связана с профилем по целочисленному `id`, поэтому
+        обновление профиля не перебирает весь индекс. Хранилище первой версии
+        (индекс по url) переносится в новую схему
+        """
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        has_profiles = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'profiles'"
+        ).fetchone()
+        self._conn.execute("DROP TABLE IF EXISTS profiles_fts")
+        if has_profiles:
+            self._conn.execute("ALTER TABLE profiles RENAME TO profiles_old")
+        self._conn.execute(
+            """
+            CREATE TABLE profiles (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                persona TEXT,
+                name TEXT,
+                location TEXT,
+                description TEXT,
+                nicknames TEXT,
+                updated_at REAL
+            )
+            """
+        )
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE profiles_fts USING "
+                "fts5(persona, name, nicknames, tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            # старые версии SQLite не поддерживают триграммы
+            logger.error("SQLite не поддерживает trigram, используется unicode61")
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE profiles_fts USING "
+                "fts5(persona, name, nicknames)"
+            )
+        if has_profiles:
+            self._conn.execute(
+                """
+                INSERT INTO profiles
+                    (url, persona, name, location, description, nicknames, updated_at)
+                SELECT url, persona, name, location, description, nicknames, updated_at
+                FROM profiles_old
+                """
+            )
+            self._conn.execute("DROP TABLE profiles_old")
+            self._conn.execute(
+                """
+                INSERT INTO profiles_fts (rowid, persona, name, nicknames)
+                SELECT id, persona, name,
+                    (SELECT group_concat(value, char(10)) FROM json_each(nicknames))
+                FROM profiles
+                """
+            )
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+
+    def upsert(self, row: dict, persona: str) -> None:
+        """
+        Функция для добавления или обновления профиля
+
+        Изменения фиксируются вызовом `commit`
+
+        Args:
+            row (dict): словарь с данными аккаунта
+            persona (str): текущий ник пользователя
+        """
+        url = row[EXCEL_FIELD.url]
+        nicknames = get_row_nicknames(row)
+        with self._lock:
+            profile_id = self.conn.execute(
+                """
+                INSERT INTO profiles
+                    (url, persona, name, location, description, nicknames, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    persona = excluded.persona,
+                    name = excluded.name,
+                    location = excluded.location,
+                    description = excluded.description,
+                    nicknames = excluded.nicknames,
+                    updated_at = excluded.updated_at
+                RETURNING id
+                """,
+                (
+                    url,
+                    persona,
+                    row.get(EXCEL_FIELD.name),
+                    row.get(EXCEL_FIELD.location),
+                    row.get(EXCEL_FIELD.description),
+                    json.dumps(nicknames, ensure_ascii=False),
+                    time.time(),
+                ),
+            ).fetchone()[0]
+            self.conn.execute("DELETE FROM profiles_fts WHERE rowid = ?", (profile_id,))
+            self.conn.execute(
+                "INSERT INTO profiles_fts (rowid, persona, name, nicknames) "
+                "VALUES (?, ?, ?, ?)",
+                (profile_id, persona, row.get(EXCEL_FIELD.name), "\n".join(nicknames)),
+            )
+
+    def commit(self) -> None:
+        """Фиксация добавленных профилей"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+
+    def get_fresh(self, url: str) -> dict | None:
+        """
+        Функция для получения актуального профиля из хранилища
+
+        Args:
+            url (str): ссылка на профиль пользователя
+
+        Returns:
+            row (Union[Dict, None]): словарь с данными аккаунта. None если профиля нет или он устарел
+        """
+        with self._lock:
+            record = self.conn.execute(
+                "SELECT * FROM profiles WHERE url = ? AND updated_at >= ?",
+                (url, time.time() - self.max_age),
+            ).fetchone()
+        if not record:
+            return
+
+        return record_to_row(record)
+
+    def search(self, nickname: str, limit: int = 100) -> list:
+        """
+        Функция для поиска профилей по нику, имени и истории ников
+
+        Args:
+            nickname (str): никнейм для поиска
+            limit (int, optional): максимальное количество результатов. По умолчанию 100
+
+        Returns:
+            results (List[Dict]): найденные профили со свежестью записей
+        """
+        # триграммный индекс ищет подстроки от 3 символов, короче - через LIKE
+        if len(nickname) >= 3:
+            where = "profiles_fts MATCH ?"
+            params = ('"{}"'.format(nickname.replace('"', '""')),)
+        else:
+            # те же столбцы, что и в индексе. % и _ в нике ищутся как символы
+            columns = ("persona", "name", "nicknames")
+            where = " OR ".join(
+                f"profiles_fts.{column} LIKE ? ESCAPE '\\'" for column in columns
+            )
+            escaped = (
+                nickname.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            params = (f"%{escaped}%",) * len(columns)
+
+        with self._lock:
+            records = self.conn.execute(
+                f"""
+                SELECT profiles.* FROM profiles_fts
+                JOIN profiles ON profiles.id = profiles_fts.rowid
+                WHERE {where}
+                ORDER BY profiles.updated_at DESC
+                LIMIT ?
+                """,
+                (*params, limit),
+            ).fetchall()
+
+        now = time.time()
+        results = []
+        for record in records:
+            age = now - record["updated_at"]
+            results.append(
+                {
+                    "url": record["url"],
+                    "persona": record["persona"],
+                    "name": record["name"],
+                    "location": record["location"],
+                    "nicknames": json.loads(record["nicknames"] or "[]"),
+                    "age": age,
+                    "stale": age > self.max_age,
+                }
+            )
+
+        return results
+
+
+def get_row_nicknames(row: dict) -> list:
+    """Функция для получения истории ников из строки отчета"""
+    nicknames = []
+    i = 1
+    while EXCEL_FIELD.nickname.format(i) in row:
+        nicknames.append(row[EXCEL_FIELD.nickname.format(i)])
+        i += 1
+
+    return nicknames
+
+
+def record_to_row(record: sqlite3.Row) -> dict:
+    """Функция для преобразования записи хранилища в строку отчета"""
+    nicknames = json.loads(record["nicknames"] or "[]")
+    row = {
+        EXCEL_FIELD.url: record["url"],
+        EXCEL_FIELD.description: record["description"],
+        EXCEL_FIELD.location: record["location"],
+        EXCEL_FIELD.name: record["name"],
+    }
+    for i, nickname in enumerate(nicknames, 1):
+        row[EXCEL_FIELD.nickname.format(i)] = nickname
+
+    return row
+
+
+def format_age(age: float) -> str:
+    """Функция для форматирования возраста записи"""
+    if age < 60:
+        return f"{age:.0f} сек."
+    if age < 3600:
+        return f"{age / 60:.0f} мин."
+    if age < 86400:
+        return f"{age / 3600:.0f} ч."
+
+    return f"{age / 86400:.0f} дн."
+
+
+# единое хранилище профилей для всех задач парсера
+profile_store = ProfileStore(STORE.db_path, STORE.max_age)
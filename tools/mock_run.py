@@ -0,0 +1,63 @@
+"""
+Запуск парсера из командной строки против локального mock сервера
+
+Ссылки [urls] перенаправляются на mock сервер, хранилище профилей и
+cookie sessionid пишутся во временную папку, чтобы не смешивать
+синтетические профили с настоящими. Аргументы после `--` передаются
+парсеру без изменений.
+
+    python tools/mock_run.py --port 8765 -- -n nick -o out.xlsx --profile
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "app")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument(
+        "--bounded", action="store_true", help="режим ограниченной памяти"
+    )
+    arg_parser.add_argument(
+        "--no-store", action="store_true", help="без записи в хранилище профилей"
+    )
+    arg_parser.add_argument("app_args", nargs=argparse.REMAINDER)
+    args = arg_parser.parse_args()
+    app_args = args.app_args[1:] if args.app_args[:1] == ["--"] else args.app_args
+
+    sys.path.insert(0, APP_DIR)
+    from snp.snp_settings import settings
+
+    mock_url = f"http://127.0.0.1:{args.port}"
+    data_dir = tempfile.mkdtemp(prefix="snp_mock_")
+    settings.URL.search_base_url = f"{mock_url}/search?"
+    settings.URL.nicknames_base_url = f"{mock_url}/{{}}/ajaxaliases/"
+    settings.STORE.db_path = os.path.join(data_dir, "profiles.db")
+    settings.SESSION.cache_file = os.path.join(data_dir, "session.json")
+    if args.bounded:
+        settings.MEMORY.bounded = True
+    if args.no_store:
+        settings.STORE.enabled = False
+
+    # ссылки на профили в карточках поиска ведут на steamcommunity
+    import snp.snp_parser as snp_parser
+
+    get_page_content = snp_parser.get_page_content
+
+    async def get_mock_page_content(session, url, *args, **kwargs):
+        url = url.replace("https://steamcommunity.com", mock_url)
+        return await get_page_content(session, url, *args, **kwargs)
+
+    snp_parser.get_page_content = get_mock_page_content
+
+    from snp.snp_cli import build_arg_parser, run_cli
+
+    run_cli(build_arg_parser().parse_args(app_args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Локальный mock сервер steamcommunity для нагрузочных тестов и профилирования
+
+Отдает страницы поиска, профили и историю ников для `--profiles`
+синтетических аккаунтов. Ответы детерминированы `--seed`, поэтому
+результаты запусков воспроизводимы.
+
+    python tools/mock_server.py --profiles 500000 --port 8765
+"""
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+
+USERS_ON_PAGE = 20
+SESSION_ID = "mocksessionid"
+
+
+def build_app(
+    profiles: int, slow_rate: float, slow_delay: float, seed: int
+) -> web.Application:
+    """
+    Функция для создания приложения mock сервера
+
+    Args:
+        profiles (int): количество аккаунтов в поиске
+        slow_rate (float): доля медленных ответов профиля
+        slow_delay (float): задержка медленного ответа профиля (сек)
+        seed (int): seed для детерминированных задержек
+    """
+    rnd = random.Random(seed)
+
+    async def search(request: web.Request) -> web.Response:
+        page = int(request.query.get("page", 1))
+        boxes = []
+        for i in range((page - 1) * USERS_ON_PAGE, min(page * USERS_ON_PAGE, profiles)):
+            boxes.append(
+                '<div class="searchPersonaInfo">'
+                f'<a class="searchPersonaName" href="https://steamcommunity.com/profiles/{i}">nick{i}</a>'
+                f'<br/>\n\t\tReal Name {i}\t\t<img src="flag.png"/>Russia</div>'
+            )
+        response = web.json_response(
+            {"success": 1, "search_result_count": profiles, "html": "".join(boxes)}
+        )
+        response.set_cookie("sessionid", SESSION_ID)
+        return response
+
+    async def profile(request: web.Request) -> web.Response:
+        if slow_rate and rnd.random() < slow_rate:
+            await asyncio.sleep(slow_delay)
+        user_id = request.match_info["user_id"]
+        return web.Response(
+            text=f'<html><div class="profile_summary">description {user_id}</div></html>',
+            content_type="text/html",
+        )
+
+    async def aliases(request: web.Request) -> web.Response:
+        user_id = int(request.match_info["user_id"])
+        return web.json_response(
+            [{"newname": f"nick{user_id}"}]
+            + [{"newname": f"old{user_id}_{i}"} for i in range(user_id % 3)]
+        )
+
+    app = web.Application()
+    app.router.add_get("/search", search)
+    app.router.add_get("/profiles/{user_id}", profile)
+    app.router.add_get("/profiles/{user_id}/ajaxaliases/", aliases)
+
+    return app
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--profiles", type=int, default=1000)
+    arg_parser.add_argument("--slow-rate", type=float, default=0.0)
+    arg_parser.add_argument("--slow-delay", type=float, default=1.0)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    app = build_app(args.profiles, args.slow_rate, args.slow_delay, args.seed)
+    web.run_app(app, host="127.0.0.1", port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
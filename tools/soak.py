@@ -0,0 +1,143 @@
+"""
+Нагрузочный тест режима ограниченной памяти
+
+Запускает mock сервер с `--profiles` аккаунтами и парсер в режиме
+ограниченной памяти, раз в `--interval` секунд снимает RSS процесса
+парсера вместе с прогрессом. После прогрева (`--warmup` доля времени
+работы) рост RSS не должен превышать `--max-growth` МБ, а без
+`--max-seconds` в отчет должны попасть все аккаунты, иначе тест
+завершается с кодом 1. Запускается из корня репозитория, как и приложение.
+
+    python tools/soak.py --profiles 500000
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRESS_RE = re.compile(r"Прогресс - (\d+)%")
+REPORT_RE = re.compile(r"Отчет содержит (\d+) из (\d+) строк")
+
+
+def get_rss(pid: int) -> float | None:
+    """RSS процесса в МБ. None если процесс уже завершился"""
+    try:
+        import psutil
+
+        return psutil.Process(pid).memory_info().rss / 2**20
+    except ImportError:
+        pass
+    except Exception:
+        return
+
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--profiles", type=int, default=500000)
+    arg_parser.add_argument("--interval", type=float, default=1.0)
+    arg_parser.add_argument("--warmup", type=float, default=0.2)
+    arg_parser.add_argument("--max-growth", type=float, default=50.0)
+    arg_parser.add_argument(
+        "--max-seconds", type=float, help="ограничение времени работы парсера"
+    )
+    arg_parser.add_argument(
+        "--no-store", action="store_true", help="без записи в хранилище профилей"
+    )
+    args = arg_parser.parse_args()
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(TOOLS_DIR, "mock_server.py"),
+            "--port",
+            str(args.port),
+            "--profiles",
+            str(args.profiles),
+        ]
+    )
+    soak_dir = tempfile.mkdtemp(prefix="snp_soak_")
+    output = os.path.join(soak_dir, "soak.xlsx")
+    log_path = os.path.join(soak_dir, "parser.log")
+    parser_args = ["-n", "soak", "-o", output]
+    if args.max_seconds:
+        parser_args += ["--max-seconds", str(args.max_seconds)]
+    run_args = ["--port", str(args.port), "--bounded"]
+    if args.no_store:
+        run_args.append("--no-store")
+    samples = []
+    progress = "0"
+    report = None
+    try:
+        time.sleep(1)
+        started = time.time()
+        with open(log_path, "w", encoding="utf-8") as log, open(
+            log_path, encoding="utf-8"
+        ) as log_reader:
+            parser = subprocess.Popen(
+                [
+                    sys.executable,
+                    os.path.join(TOOLS_DIR, "mock_run.py"),
+                    *run_args,
+                    "--",
+                    *parser_args,
+                ],
+                stdout=log,
+                stderr=log,
+            )
+            while True:
+                finished = parser.poll() is not None
+                # лог парсера читается по мере записи
+                for line in log_reader:
+                    if match := PROGRESS_RE.search(line):
+                        progress = match.group(1)
+                    elif match := REPORT_RE.search(line):
+                        report = int(match.group(1)), int(match.group(2))
+                if finished:
+                    break
+                rss = get_rss(parser.pid)
+                if rss is not None:
+                    samples.append((time.time() - started, rss))
+                    print(
+                        f"{samples[-1][0]:8.1f} с  RSS {rss:8.1f} МБ  прогресс {progress}%",
+                        flush=True,
+                    )
+                time.sleep(args.interval)
+    finally:
+        server.terminate()
+        server.wait()
+
+    if parser.returncode or not samples or report is None:
+        print(f"Парсер завершился с кодом {parser.returncode}, лог {log_path}")
+        sys.exit(1)
+
+    rows, users_count = report
+    warm_samples = [rss for t, rss in samples if t >= samples[-1][0] * args.warmup]
+    growth = max(warm_samples) - warm_samples[0]
+    print(
+        f"Собрано {rows} из {users_count} аккаунтов за {samples[-1][0]:.0f} с, "
+        f"RSS после прогрева {warm_samples[0]:.1f} МБ, "
+        f"максимум {max(warm_samples):.1f} МБ, рост {growth:.1f} МБ"
+    )
+    if growth > args.max_growth:
+        print(f"Рост RSS превышает {args.max_growth} МБ")
+        sys.exit(1)
+    if not args.max_seconds and rows < users_count:
+        print(f"В отчет попали не все аккаунты, лог {log_path}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
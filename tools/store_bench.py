@@ -0,0 +1,59 @@
+"""
+Проверка времени записи профиля в локальное хранилище по мере его роста
+
+Записывает `--profiles` синтетических профилей во временную базу пачками
+по `--batch`, каждый профиль записывается дважды (добавление и обновление).
+Среднее время записи в последней пачке не должно превышать время в первой
+больше чем в `--max-ratio` раз, иначе проверка завершается с кодом 1.
+Запускается из корня репозитория, как и приложение.
+
+    python tools/store_bench.py --profiles 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "app")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--profiles", type=int, default=20000)
+    arg_parser.add_argument("--batch", type=int, default=2000)
+    arg_parser.add_argument("--max-ratio", type=float, default=3.0)
+    args = arg_parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    from snp.snp_settings.settings import EXCEL_FIELD
+    from snp.snp_storage import ProfileStore
+
+    store = ProfileStore(os.path.join(tempfile.mkdtemp(), "profiles.db"), 3600)
+    timings = []
+    for start in range(0, args.profiles, args.batch):
+        started = time.perf_counter()
+        for i in range(start, min(start + args.batch, args.profiles)):
+            url = f"https://steamcommunity.com/profiles/{i}"
+            for nickname in (f"nick{i}", f"renamed{i}"):
+                row = {
+                    EXCEL_FIELD.url: url,
+                    EXCEL_FIELD.name: f"Real Name {i}",
+                    EXCEL_FIELD.nickname.format(1): nickname,
+                    EXCEL_FIELD.nickname.format(2): f"old{i}",
+                }
+                store.upsert(row, nickname)
+        store.commit()
+        per_upsert = (time.perf_counter() - started) / (2 * args.batch) * 1000
+        timings.append(per_upsert)
+        print(f"{start + args.batch:8} профилей  {per_upsert:.3f} мс на запись")
+
+    ratio = timings[-1] / timings[0]
+    print(f"Последняя пачка медленнее первой в {ratio:.2f} раз")
+    if ratio > args.max_ratio:
+        print(f"Время записи растет больше чем в {args.max_ratio} раз")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()